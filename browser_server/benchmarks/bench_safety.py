@@ -0,0 +1,87 @@
+"""
+Throughput benchmark for validate_url with a large blocklist.
+
+    python benchmarks/bench_safety.py --domains 300000 --urls 500000
+
+Builds a synthetic blocklist in a temp dir, measures cold (parse + index)
+and warm (pickled index) load times, then checks a mixed URL set and
+reports URLs per second. Exits non-zero when below --target.
+"""
+import argparse
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.safety import UrlChecker  # noqa: E402
+
+
+def random_domain(rng: random.Random) -> str:
+    labels = rng.randint(1, 3)
+    name = ".".join(
+        "".join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(3, 12)))
+        for _ in range(labels)
+    )
+    return f"{name}.{rng.choice(['com', 'net', 'org', 'io', 'de', 'co.uk'])}"
+
+
+def make_urls(rng: random.Random, blocked: list[str], count: int) -> list[str]:
+    paths = ["/", "/docs/index.html", "/a/b/c?x=1&y=2", "/download/setup.exe", "/blog/post-1#top"]
+    urls = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.2:
+            host = "cdn." + rng.choice(blocked)  # subdomain of a blocked domain
+        elif roll < 0.25:
+            host = random_domain(rng).rsplit(".", 1)[0] + ".xyz"
+        else:
+            host = "www." + random_domain(rng)
+        urls.append(f"https://{host}{rng.choice(paths)}")
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--domains", type=int, default=300_000, help="blocklist size")
+    parser.add_argument("--urls", type=int, default=500_000, help="URLs to validate")
+    parser.add_argument("--target", type=float, default=100_000, help="minimum URLs/second")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    blocked = [random_domain(rng) for _ in range(args.domains)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        list_dir = Path(tmp)
+        (list_dir / "synthetic.txt").write_text(
+            "# synthetic blocklist\n" + "\n".join(f"0.0.0.0 {d}" for d in blocked), encoding="utf-8"
+        )
+
+        start = time.perf_counter()
+        UrlChecker(list_dir)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        checker = UrlChecker(list_dir)
+        warm = time.perf_counter() - start
+
+        urls = make_urls(rng, blocked, args.urls)
+        start = time.perf_counter()
+        rejected = sum(1 for url in urls if not checker.check(url)[0])
+        elapsed = time.perf_counter() - start
+
+    rate = args.urls / elapsed
+    print(f"blocklist domains : {len(checker.blocked_domains):,}")
+    print(f"cold load (parse) : {cold * 1000:.0f} ms")
+    print(f"warm load (index) : {warm * 1000:.0f} ms")
+    print(f"validated         : {args.urls:,} URLs in {elapsed:.2f} s ({rejected:,} rejected)")
+    print(f"throughput        : {rate:,.0f} URLs/s (target {args.target:,.0f})")
+    return 0 if rate >= args.target else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
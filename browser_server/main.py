@@ -1,11 +1,28 @@
 from mcp.server.fastmcp import FastMCP 
 from tools.tools import register_browser_tools
+from mcp_common.stats import instrument
+from utils.browser import manager
+import argparse
 
 mcp = FastMCP("Browser")
 
 def main():
+    parser = argparse.ArgumentParser(description="Browser MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio",
+                        help="stdio (default) for a private child process, streamable-http/sse to share one browser")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address for HTTP transports")
+    parser.add_argument("--port", type=int, default=8766, help="port for HTTP transports")
+    args = parser.parse_args()
+
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+
+    # Over HTTP several clients use the same pages, so none may fall back to another's last page
+    manager.shared = args.transport != "stdio"
+
+    instrument(mcp)
     register_browser_tools(mcp)
-    mcp.run(transport="stdio")
+    mcp.run(transport=args.transport)
 
 if __name__ == "__main__":
     main()
@@ -1,37 +1,215 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from utils.browser import manager,SCREENSHOT_DIR
 from datetime import datetime
 from utils.safety import validate_url
+from utils.extract import extract, DEFAULT_MAX_CHARS
+from mcp_common.stats import profiled
+from urllib.parse import urlparse
+import asyncio
+import json
+import time
+
+FETCH_MANY_MAX_URLS = 20
+FETCH_MANY_PER_HOST = 2
+
+def _progress(ctx: Context, total: float | None = None):
+    """
+    Build an async progress callback for a tool call. Messages follow the
+    file-ops server's convention: JSON {"message": str, "partial": [...]}.
+    """
+    step = 0
+
+    async def report(message: str, partial: list | None = None):
+        nonlocal step
+        step += 1
+        await ctx.report_progress(step, total, json.dumps({"message": message, "partial": partial or []}))
+
+    return report
+
 
 def register_browser_tools(mcp: FastMCP):
 
     @mcp.tool()
-    async def open_url(url: str) -> str:
-        """Open a URL in the browser."""
-        return await manager.goto(url)
+    async def open_url(
+        url: str,
+        ctx: Context,
+        page_id: str | None = None,
+        wait_until: str | None = None,
+        render: bool | None = None,
+        max_age: int | None = None,
+    ) -> dict:
+        """
+        Open a URL in the browser.
+        Returns a page_id handle for the page; pass it to the other browser
+        tools to work with that page. Omit page_id to open a new page.
+        Static pages are served from the page cache ("via": "cache") or
+        fetched over plain HTTP ("via": "http"), and only loaded in the
+        browser when they need JavaScript.
+
+        Args:
+            url: HTTPS URL to open.
+            page_id: Existing page to navigate instead of opening a new one.
+            wait_until: "commit", "domcontentloaded", "load" or "networkidle".
+                Defaults to "domcontentloaded" in fast mode, "load" otherwise.
+            render: true to always use the browser, false to never use it.
+            max_age: Accept a cached copy up to this many seconds old
+                (0 forces a fresh fetch). By default the page's own
+                caching headers decide.
+        """
+        return await manager.goto(url, page_id, wait_until, render, max_age, on_progress=_progress(ctx))
     
     @mcp.tool()
-    async def get_page_content() -> str:
-        """Get the HTML content of the current page."""
-        return await manager.get_content()
+    async def get_page_content(page_id: str | None = None) -> str:
+        """
+        Get the raw HTML content of a page (the most recently used one by default,
+        unless the server is shared).
+        This is usually very large; use extract_text unless the markup itself is needed.
+        """
+        return await manager.get_content(page_id)
+
+    async def _extract(page_id, selector, max_chars, markdown) -> dict:
+        try:
+            url, html = await manager.snapshot(page_id)
+            # Parsing multi-megabyte pages is CPU bound, keep it off the event loop
+            result = await asyncio.to_thread(
+                profiled(extract), html, url, selector=selector, max_chars=max_chars, markdown=markdown
+            )
+        except (LookupError, ValueError) as e:
+            return {"error": str(e)}
+        except RecursionError:
+            return {"error": "Page is nested too deeply to extract."}
+        if page_id is not None:
+            result["page_id"] = page_id
+        return result
+
+    @mcp.tool()
+    async def extract_text(page_id: str | None = None, selector: str | None = None, max_chars: int = DEFAULT_MAX_CHARS) -> dict:
+        """
+        Get the readable main text of a page, without scripts, markup or
+        navigation/footer boilerplate. Prefer this over get_page_content.
+
+        Args:
+            page_id: Page handle from open_url (defaults to the most recent page;
+                required when the server is shared).
+            selector: Optional CSS selector (tag, #id, .class, descendants) to
+                limit extraction to part of the page.
+            max_chars: Character budget for the returned content.
+        """
+        return await _extract(page_id, selector, max_chars, markdown=False)
+
+    @mcp.tool()
+    async def extract_markdown(page_id: str | None = None, selector: str | None = None, max_chars: int = DEFAULT_MAX_CHARS) -> dict:
+        """
+        Same as extract_text but keeps headings, lists, code blocks and
+        emphasis as Markdown, with links as numbered references.
+        """
+        return await _extract(page_id, selector, max_chars, markdown=True)
+
+    @mcp.tool()
+    async def fetch_many(
+        urls: list[str],
+        ctx: Context,
+        markdown: bool = False,
+        max_chars: int = 4000,
+        timeout: float = 30.0,
+        render: bool | None = None,
+        max_age: int | None = None,
+    ) -> list[dict]:
+        """
+        Fetch several URLs concurrently and return the readable content of each.
+        Use this instead of calling open_url + extract_text once per page.
+        Each result keeps the requested url; fetched ones add final_url,
+        the address after redirects.
+
+        Args:
+            urls: HTTPS URLs to fetch (at most 20).
+            markdown: Return Markdown instead of plain text.
+            max_chars: Character budget per page.
+            timeout: Overall time limit in seconds; unfinished URLs are
+                reported with status "timeout".
+            render / max_age: As for open_url.
+        """
+        if len(urls) > FETCH_MANY_MAX_URLS:
+            return [{"error": f"Too many URLs ({len(urls)}); the limit is {FETCH_MANY_MAX_URLS}."}]
+
+        host_limits = {}
+        start = time.perf_counter()
+        report = _progress(ctx, total=len(urls))
+
+        def elapsed_ms():
+            return round((time.perf_counter() - start) * 1000, 1)
+
+        async def fetch_one(url: str) -> dict:
+            is_safe, result = validate_url(url)
+            if not is_safe:
+                return {"url": url, "status": "blocked", "error": result, "elapsed_ms": 0.0}
+
+            host = urlparse(result).hostname or ""
+            limit = host_limits.setdefault(host, asyncio.Semaphore(FETCH_MANY_PER_HOST))
+            async with limit:
+                try:
+                    page = await manager.load(result, render=render, max_age=max_age)
+                    extracted = await asyncio.to_thread(
+                        extract, page.pop("html"), page["url"],
+                        max_chars=max_chars, max_links=10, markdown=markdown,
+                    )
+                except Exception as e:
+                    return {"url": url, "status": "error", "error": f"{type(e).__name__}: {e}", "elapsed_ms": elapsed_ms()}
+
+            return {
+                "url": url,
+                "final_url": page.pop("url"),  # after redirects; url stays as requested
+                "status": "ok",
+                "http_status": page.pop("status"),
+                **page,
+                "title": extracted["title"],
+                "content": extracted["content"],
+                "truncated": extracted["truncated"],
+                "links": extracted["links"],
+            }
+
+        async def fetch_and_report(url: str) -> dict:
+            # Each finished page is streamed to the client as a partial result
+            result = await fetch_one(url)
+            await report(f"{url}: {result['status']}", partial=[result])
+            return result
+
+        tasks = [asyncio.create_task(fetch_and_report(url)) for url in urls]
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        # Let cancelled fetches unwind (release browser pages, host slots) before returning
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for url, task in zip(urls, tasks):
+            if task in done:
+                results.append(task.result())
+            else:
+                results.append({"url": url, "status": "timeout", "error": f"Not finished within {timeout:g}s.", "elapsed_ms": elapsed_ms()})
+        return results
+
+    @mcp.tool()
+    async def close_page(page_id: str) -> str:
+        """Close a page opened with open_url and free its slot."""
+        try:
+            await manager.close_page(page_id)
+            return f"Closed page '{page_id}'."
+        except LookupError as e:
+            return f"Error: {e}"
     
     @mcp.tool()
-    async def take_screenshot(url: str | None = None, filename: str = "screenshot.png") -> str:
+    async def take_screenshot(url: str | None = None, filename: str = "screenshot.png", page_id: str | None = None) -> str:
         """
         Take a screenshot and save it in the browser server's screenshots folder.
+        Uses the given page_id (or the most recently used page, unless the
+        server is shared), or opens a new page when only a url is supplied.
         """
         if url:
             is_safe, result = validate_url(url)
             if not is_safe:
                 return f"Blocked unsafe URL: {result}"
 
-            await manager.start_browser()
-            await manager.page.goto(result)
-
-        else:
-            # Ensure browser is running even if no URL supplied
-            await manager.start_browser()
-
         if filename is None or filename.strip() == "":
             timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             filename = f"screenshot_{timestamp}.png"
@@ -43,7 +221,12 @@ def register_browser_tools(mcp: FastMCP):
         save_path = SCREENSHOT_DIR / filename
 
         try:
-            await manager.page.screenshot(path=str(save_path))
+            async with manager.use_page(page_id, new=bool(url) and page_id is None) as slot:
+                if url:
+                    await manager.navigate(slot, result)
+                await slot.page.screenshot(path=str(save_path))
             return f"Screenshot saved to: {save_path}"
+        except LookupError as e:
+            return f"Error: {e}"
         except Exception as e:
-            return f"Error taking screenshot: {str(e)}"
\ No newline at end of file
+            return f"Error taking screenshot: {str(e)}"
@@ -1,41 +1,459 @@
-from playwright.async_api import async_playwright   
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from pathlib import Path
+import asyncio
+import itertools
+import os
+import secrets
+import time
+from urllib.parse import urlparse
 from .safety import validate_url
-SCREENSHOT_DIR = Path(__file__).parent.parent / "screenshots" 
+from .http import fetch, needs_javascript, FetchError
+from .cache import PageCache, freshness, validators
+SCREENSHOT_DIR = Path(__file__).parent.parent / "screenshots"
 SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
 # Change the directory above as needed by default creates a screenshots folder in current directory
 
+# Number of isolated pages (one browser context each) kept open at once
+POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "4"))
+# Navigations allowed to run at the same time across all pages
+MAX_NAVIGATIONS = int(os.environ.get("BROWSER_MAX_NAVIGATIONS", "2"))
+# Fast mode: headless, skips heavy resources and trackers, waits for DOMContentLoaded
+FAST_MODE = os.environ.get("BROWSER_FAST_MODE", "0") == "1"
+HEADLESS = os.environ.get("BROWSER_HEADLESS", "1" if FAST_MODE else "0") == "1"
+
+# Pages fetched over plain HTTP kept around for follow-up tool calls
+MAX_STATIC_PAGES = 32
+
+NAVIGATION_TIMEOUT_MS = 45000
+# Upper bound on the extra wait for "networkidle" after the DOM is ready
+NETWORK_IDLE_CAP_MS = 5000
+WAIT_STRATEGIES = {"commit", "domcontentloaded", "load", "networkidle"}
+
+# Resource types aborted in fast mode
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# Ad / tracker domains aborted in fast mode (subdomains included)
+TRACKER_DOMAINS = {
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com",
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com",
+    "facebook.net", "scorecardresearch.com", "adnxs.com", "criteo.com",
+    "criteo.net", "taboola.com", "outbrain.com", "hotjar.com", "segment.io",
+    "amazon-adsystem.com", "quantserve.com", "moatads.com", "adsrvr.org",
+}
+
+
+def is_tracker(host: str) -> bool:
+    """Check a hostname and all its parent domains against TRACKER_DOMAINS."""
+    labels = host.lower().rstrip(".").split(".")
+    return any(".".join(labels[i:]) in TRACKER_DOMAINS for i in range(len(labels) - 1))
+
+
+class PooledPage:
+    """One page in its own browser context, plus the lock guarding it."""
+
+    def __init__(self, page_id: str, context, page):
+        self.page_id = page_id
+        self.context = context
+        self.page = page
+        self.lock = asyncio.Lock()
+        self.blocked_requests = 0
+        self.response_headers = {}
+
+
+async def _notify(on_progress, message: str):
+    if on_progress is not None:
+        await on_progress(message)
+
+
+class StaticPage:
+    """A page fetched over plain HTTP; reopened in the browser when needed."""
+
+    def __init__(self, page_id: str, url: str, html: str):
+        self.page_id = page_id
+        self.url = url
+        self.html = html
+
+
 class BrowserManager:
-    def __init__(self):
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        max_navigations: int = MAX_NAVIGATIONS,
+        fast_mode: bool = FAST_MODE,
+        headless: bool = HEADLESS,
+    ):
         self.playwright = None
         self.browser = None
-        self.page = None
+        self.pool_size = pool_size
+        self.max_navigations = max_navigations
+        self.fast_mode = fast_mode
+        self.headless = headless
+
+        # page_id -> PooledPage, least recently used first
+        self.pages: OrderedDict[str, PooledPage] = OrderedDict()
+        # page_id -> StaticPage, same handle space as self.pages
+        self.static_pages: OrderedDict[str, StaticPage] = OrderedDict()
+        self.last_page_id = None
+        # Set when served over HTTP to several clients; "the last page" is then someone else's
+        self.shared = False
+        self.cache = PageCache()
+        self._ids = itertools.count(1)
+        self._start_lock = asyncio.Lock()
+        self._pool_changed = asyncio.Condition()
+        self._navigations = asyncio.Semaphore(max_navigations)
 
     async def start_browser(self):
         """ensure the browser is started"""
-        if self.playwright is None:
-            self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(headless=False)
-            self.page = await self.browser.new_page()
+        async with self._start_lock:
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(headless=self.headless)
+
+    async def new_page(self, page_id: str | None = None) -> PooledPage:
+        """
+        Open a fresh page in its own context and return it locked.
+        A page_id can be given to reuse the handle of a static page.
+        When the pool is full the least recently used idle page is recycled;
+        if every page is busy this waits until one is released.
+        """
+        await self.start_browser()
+
+        async with self._pool_changed:
+            while len(self.pages) >= self.pool_size:
+                idle = next((p for p in self.pages.values() if not p.lock.locked()), None)
+                if idle is not None:
+                    await self._close(idle)
+                    break
+                await self._pool_changed.wait()
+
+            context = await self.browser.new_context()
+            page = await context.new_page()
+            slot = PooledPage(page_id or self._new_id(), context, page)
+            if self.fast_mode:
+                await context.route("**/*", lambda route: self._filter_request(slot, route))
+            await slot.lock.acquire()
+            self.pages[slot.page_id] = slot
+            return slot
+
+    def _new_id(self) -> str:
+        if self.shared:
+            return f"p{next(self._ids)}-{secrets.token_hex(4)}"  # not guessable from another client's ids
+        return f"p{next(self._ids)}"
+
+    def resolve_id(self, page_id: str | None) -> str | None:
+        """
+        Default to the most recently used page, static or not.
+        Raises LookupError when shared, where a page_id is required.
+        """
+        if page_id is not None:
+            return page_id
+        if self.shared:
+            raise LookupError("This browser server is shared; pass the page_id returned by open_url.")
+        if self.last_page_id in self.pages or self.last_page_id in self.static_pages:
+            return self.last_page_id
+        return next(reversed(self.pages), None)
+
+    def get_page(self, page_id: str | None = None) -> PooledPage | None:
+        """Look up a browser page by handle, or the most recently used one."""
+        return self.pages.get(self.resolve_id(page_id))
+
+    @asynccontextmanager
+    async def use_page(self, page_id: str | None = None, new: bool = False):
+        """
+        Hold a page exclusively for the duration of the block.
+        Static pages are reopened in the browser under the same handle.
+        Raises LookupError if the handle is unknown or was recycled.
+        """
+        page_id = page_id if new else self.resolve_id(page_id)
+        if new:
+            slot = await self.new_page(page_id)
+        elif page_id in self.static_pages:
+            static = self.static_pages.pop(page_id)
+            slot = await self.new_page(page_id)
+            try:
+                await self.navigate(slot, static.url)
+            except BaseException:
+                slot.lock.release()
+                raise
+        else:
+            slot = self.get_page(page_id)
+            if slot is None:
+                if page_id is None:
+                    raise LookupError("Browser not running.")
+                raise LookupError(f"Unknown page '{page_id}'.")
+            await slot.lock.acquire()
+            if slot.page_id not in self.pages:
+                slot.lock.release()
+                raise LookupError(f"Page '{slot.page_id}' was closed.")
+
+        self.pages.move_to_end(slot.page_id)
+        self.last_page_id = slot.page_id
+        try:
+            yield slot
+        finally:
+            slot.lock.release()
+            # Wake up callers waiting for a free page
+            async with self._pool_changed:
+                self._pool_changed.notify_all()
+
+    async def _close(self, slot: PooledPage):
+        self.pages.pop(slot.page_id, None)
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    async def _filter_request(slot: PooledPage, route):
+        """Abort heavy resources and tracker requests (fast mode only)."""
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or is_tracker(urlparse(request.url).hostname or ""):
+            slot.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def close_page(self, page_id: str):
+        """Close a page and free its slot in the pool."""
+        if self.static_pages.pop(page_id, None) is not None:
+            return
+        async with self.use_page(page_id) as slot:
+            await self._close(slot)
 
-    async def goto(self, url: str):
+    def resolve_wait(self, wait_until: str | None) -> str:
+        """Apply the mode's default wait strategy and reject unknown ones."""
+        if wait_until is None:
+            return "domcontentloaded" if self.fast_mode else "load"
+        if wait_until not in WAIT_STRATEGIES:
+            raise ValueError(f"Unknown wait strategy '{wait_until}'. Use one of: {', '.join(sorted(WAIT_STRATEGIES))}.")
+        return wait_until
+
+    async def navigate(self, slot: PooledPage, url: str, wait_until: str | None = None) -> dict:
+        """
+        Navigate a page, counting against the concurrent navigation limit.
+        Returns the HTTP status, wait strategy used and timing.
+
+        wait_until is one of WAIT_STRATEGIES; it defaults to
+        "domcontentloaded" in fast mode and "load" otherwise. "networkidle"
+        waits for the DOM first, then for the network to settle for at
+        most NETWORK_IDLE_CAP_MS.
+        """
+        wait_until = self.resolve_wait(wait_until)
+
+        slot.blocked_requests = 0
+        async with self._navigations:
+            start = time.perf_counter()
+            goto_wait = "domcontentloaded" if wait_until == "networkidle" else wait_until
+            response = await slot.page.goto(url, timeout=NAVIGATION_TIMEOUT_MS, wait_until=goto_wait)
+            if wait_until == "networkidle":
+                try:
+                    await slot.page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_CAP_MS)
+                except PlaywrightTimeoutError:
+                    pass  # capped: a page that never goes idle is still usable
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        slot.response_headers = await response.all_headers() if response else {}
+
+        return {
+            "via": "browser",
+            "status": response.status if response else None,
+            "wait_until": wait_until,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "blocked_requests": slot.blocked_requests,
+        }
+
+    async def goto(
+        self,
+        url: str,
+        page_id: str | None = None,
+        wait_until: str | None = None,
+        render: bool | None = None,
+        max_age: int | None = None,
+        on_progress=None,
+    ) -> dict:
+        """
+        Open a URL, from the page cache or over plain HTTP when possible.
+
+        render=None tries the cache and a plain HTTP fetch first and falls
+        back to the browser when the page looks like it needs JavaScript;
+        True always uses the browser, False never does. max_age (seconds)
+        overrides the cached response's own freshness; 0 forces a refetch.
+        Every path returns the same keys. on_progress, if given, is awaited
+        with a short message at each stage.
+        """
         is_safe, result = validate_url(url)
-        
+
         if not is_safe:
-            return f"Blocked unsafe URL: {result}"
+            return {"error": f"Blocked unsafe URL: {result}"}
 
-        await self.start_browser()
-        await self.page.goto(result, timeout=45000)
-        return f"Opened URL: {result}"
-    
-    async def get_content(self):
-        """Return HTML of current page."""
-        if not await self.ensure_page():
-            return "Error: Browser not running."
-        return await self.page.content()
-    
-    async def ensure_page(self):
-        """Check if the page exists."""
-        return self.page is not None
-    
-manager = BrowserManager()
\ No newline at end of file
+        try:
+            wait_until = self.resolve_wait(wait_until)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        fallback_reason = None
+        reusable = page_id is None or page_id in self.static_pages
+        if render is not True and reusable:
+            start = time.perf_counter()
+            await _notify(on_progress, f"Fetching {result} over HTTP")
+            try:
+                fetched, via = await self.fetch_static(result, max_age)
+                fallback_reason = needs_javascript(fetched) if via == "http" else None
+            except FetchError as e:
+                if render is False:
+                    return {"error": f"Could not fetch '{result}': {e}"}
+                fallback_reason = str(e)
+
+            if fallback_reason is None or render is False:
+                elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+                return self._store_static(page_id, fetched, via, elapsed_ms)
+
+        # A static handle is reopened in the browser under the same id
+        new = page_id is None or self.static_pages.pop(page_id, None) is not None
+        await _notify(on_progress, f"Rendering in browser ({fallback_reason})" if fallback_reason else "Rendering in browser")
+
+        try:
+            async with self.use_page(page_id, new=new) as slot:
+                timing = await self.navigate(slot, result, wait_until)
+                page = {"page_id": slot.page_id, "url": slot.page.url, **timing}
+                await self._cache_rendered(result, slot, timing["status"])
+        except LookupError as e:
+            return {"error": str(e)}
+
+        if fallback_reason:
+            page["fallback_reason"] = fallback_reason
+        return page
+
+    async def load(
+        self,
+        url: str,
+        wait_until: str | None = None,
+        render: bool | None = None,
+        max_age: int | None = None,
+    ) -> dict:
+        """
+        Fetch a validated URL once, without keeping a page handle around.
+        Same cache / HTTP / browser escalation as goto, but the result also
+        carries the page HTML, and any browser page used is closed again.
+        Raises FetchError, ValueError or Playwright errors.
+        """
+        wait_until = self.resolve_wait(wait_until)
+        start = time.perf_counter()
+        fallback_reason = None
+
+        if render is not True:
+            try:
+                fetched, via = await self.fetch_static(url, max_age)
+                fallback_reason = needs_javascript(fetched) if via == "http" else None
+            except FetchError as e:
+                if render is False:
+                    raise
+                fallback_reason = str(e)
+
+            if fallback_reason is None or render is False:
+                return {
+                    "url": fetched["url"],
+                    "via": via,
+                    "status": fetched["status"],
+                    "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                    "html": fetched["html"],
+                }
+
+        async with self.use_page(new=True) as slot:
+            try:
+                timing = await self.navigate(slot, url, wait_until)
+                await self._cache_rendered(url, slot, timing["status"])
+                html = await slot.page.content()
+                final_url = slot.page.url
+            finally:
+                await self._close(slot)
+
+        page = {
+            "url": final_url,
+            "via": "browser",
+            "status": timing["status"],
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            "html": html,
+        }
+        if fallback_reason:
+            page["fallback_reason"] = fallback_reason
+        return page
+
+    async def fetch_static(self, url: str, max_age: int | None = None) -> tuple[dict, str]:
+        """
+        Fetch a page over plain HTTP through the page cache.
+        Fresh entries are served directly, stale ones are revalidated with
+        ETag / Last-Modified when possible. Returns (page, via) where via is
+        "cache" or "http". Raises FetchError.
+        """
+        entry = await asyncio.to_thread(self.cache.get, url) if max_age != 0 else None
+        conditional = {}
+
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            fresh = age <= max_age if max_age is not None else time.time() < entry["expires_at"]
+            if fresh:
+                return entry, "cache"
+            conditional = validators(entry)
+
+        fetched = await fetch(url, headers=conditional or None)
+        if entry is not None and fetched["status"] == 304:
+            await asyncio.to_thread(self.cache.revalidated, url, fetched["headers"])
+            return entry, "cache"
+
+        if needs_javascript(fetched) is None:
+            await asyncio.to_thread(self.cache.put, url, fetched, "http")
+        return fetched, "http"
+
+    async def _cache_rendered(self, url: str, slot: PooledPage, status: int | None):
+        """Store a browser-rendered page when its response allows caching."""
+        if status is None or not 200 <= status < 300:
+            return
+        if freshness(slot.response_headers, time.time()) is None:
+            return
+        rendered = {
+            "url": slot.page.url,
+            "status": status,
+            "headers": slot.response_headers,
+            "html": await slot.page.content(),
+        }
+        await asyncio.to_thread(self.cache.put, url, rendered, "browser")
+
+    def _store_static(self, page_id: str | None, fetched: dict, via: str, elapsed_ms: float) -> dict:
+        page_id = page_id or self._new_id()
+        self.static_pages[page_id] = StaticPage(page_id, fetched["url"], fetched["html"])
+        self.static_pages.move_to_end(page_id)
+        while len(self.static_pages) > MAX_STATIC_PAGES:
+            self.static_pages.popitem(last=False)
+        self.last_page_id = page_id
+
+        return {
+            "page_id": page_id,
+            "url": fetched["url"],
+            "via": via,
+            "status": fetched["status"],
+            "wait_until": None,
+            "elapsed_ms": elapsed_ms,
+            "blocked_requests": 0,
+        }
+
+    async def get_content(self, page_id: str | None = None):
+        """Return HTML of a page (the most recently used one by default)."""
+        try:
+            _, html = await self.snapshot(page_id)
+            return html
+        except LookupError as e:
+            return f"Error: {e}"
+
+    async def snapshot(self, page_id: str | None = None) -> tuple[str, str]:
+        """Return (url, html) of a page. Raises LookupError for unknown pages."""
+        static = self.static_pages.get(self.resolve_id(page_id))
+        if static is not None:
+            self.static_pages.move_to_end(static.page_id)
+            self.last_page_id = static.page_id
+            return static.url, static.html
+        async with self.use_page(page_id) as slot:
+            return slot.page.url, await slot.page.content()
+
+manager = BrowserManager()
@@ -0,0 +1,184 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+CACHE_DIR = Path(os.environ.get("BROWSER_CACHE_DIR", Path(__file__).parent.parent / "cache"))
+MAX_CACHE_BYTES = int(float(os.environ.get("BROWSER_CACHE_MAX_MB", "100")) * 1024 * 1024)
+# Freshness used when a response carries no caching headers at all
+DEFAULT_TTL = 300
+# Cap for the Last-Modified heuristic (10% of the document's age)
+MAX_HEURISTIC_TTL = 24 * 3600
+
+_MAX_AGE = re.compile(r"(?:^|,)\s*(s-maxage|max-age)\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """Cache key: lowercase scheme/host, no default port, no fragment, sorted query."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    port = parts.port
+    netloc = host if port is None or (scheme, port) in (("https", 443), ("http", 80)) else f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def _parse_http_date(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness(headers: dict, now: float) -> float | None:
+    """
+    Seconds a response may be served without revalidation, following
+    Cache-Control, Expires and the Last-Modified heuristic.
+    None means the response must not be stored at all.
+    """
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+
+    ages = dict((k.lower(), int(v)) for k, v in _MAX_AGE.findall(cache_control))
+    if "s-maxage" in ages or "max-age" in ages:
+        return ages.get("s-maxage", ages.get("max-age"))
+
+    expires = _parse_http_date(headers.get("expires"))
+    if expires is not None:
+        date = _parse_http_date(headers.get("date")) or now
+        return max(0.0, expires - date)
+
+    last_modified = _parse_http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        return min(max(0.0, (now - last_modified) * 0.1), MAX_HEURISTIC_TTL)
+
+    return DEFAULT_TTL
+
+
+class PageCache:
+    """
+    Persistent page cache in SQLite, keyed by normalized URL.
+    Bodies are stored zlib-compressed; the least recently used entries are
+    evicted once the total stored size exceeds max_bytes.
+    """
+
+    def __init__(self, path: Path = CACHE_DIR / "pages.db", max_bytes: int = MAX_CACHE_BYTES):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                via TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages(last_access)")
+        self._db.commit()
+
+    def get(self, url: str) -> dict | None:
+        """Return the stored entry for a URL (fresh or not), or None."""
+        key = normalize_url(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, headers, body, via, fetched_at, expires_at FROM pages WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE pages SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+        url, status, headers, body, via, fetched_at, expires_at = row
+        return {
+            "url": url,
+            "status": status,
+            "headers": json.loads(headers),
+            "html": zlib.decompress(body).decode("utf-8"),
+            "via": via,
+            "fetched_at": fetched_at,
+            "expires_at": expires_at,
+        }
+
+    def put(self, url: str, fetched: dict, via: str) -> bool:
+        """Store a fetched page unless its headers forbid it or it was cut short. Returns True if stored."""
+        if fetched.get("truncated"):
+            return False  # would later be served as if it were the whole page
+        now = time.time()
+        ttl = freshness(fetched["headers"], now)
+        if ttl is None or not 200 <= fetched["status"] < 300:
+            return False
+
+        body = zlib.compress(fetched["html"].encode("utf-8"), 6)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    normalize_url(url), fetched["url"], fetched["status"],
+                    json.dumps(fetched["headers"]), body, len(body), via,
+                    now, now + ttl, now,
+                ),
+            )
+            self._evict()
+            self._db.commit()
+        return True
+
+    def revalidated(self, url: str, headers: dict):
+        """Refresh an entry after a 304 Not Modified, merging the new headers."""
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT headers FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            merged = {**json.loads(row[0]), **headers}
+            ttl = freshness(merged, now) or 0
+            self._db.execute(
+                "UPDATE pages SET headers = ?, fetched_at = ?, expires_at = ?, last_access = ? WHERE key = ?",
+                (json.dumps(merged), now, now + ttl, now, key),
+            )
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM pages ORDER BY last_access").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM pages WHERE key = ?", doomed)
+
+
+def validators(entry: dict) -> dict:
+    """Conditional request headers for revalidating a cached entry."""
+    headers = {}
+    if entry["headers"].get("etag"):
+        headers["If-None-Match"] = entry["headers"]["etag"]
+    if entry["headers"].get("last-modified"):
+        headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+    return headers
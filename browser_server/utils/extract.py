@@ -0,0 +1,468 @@
+import re
+from collections import Counter
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+# Never rendered
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas",
+    "iframe", "object", "embed", "title",
+}
+# Page chrome that rarely holds the main content
+BOILERPLATE_TAGS = {"nav", "footer", "header", "aside", "form", "button", "dialog", "select", "menu"}
+BOILERPLATE_HINT = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|footer|sidebar|breadcrumbs?|cookie|consent|banner|"
+    r"advert|ads?|promo|share|social|related|comments?|popup|modal|newsletter|subscribe)($|[\s_-])",
+    re.IGNORECASE,
+)
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "body", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "li",
+    "main", "ol", "p", "pre", "section", "table", "tr", "ul", "br",
+}
+CONTAINER_TAGS = {"div", "section", "article", "main", "td", "body"}
+
+# Optional end tags: a start tag (key) closes an open element of the given
+# kinds, searching up to (not past) the boundary elements
+IMPLIED_END = {
+    "li": ({"li"}, {"ul", "ol", "menu"}),
+    "dt": ({"dt", "dd"}, {"dl"}),
+    "dd": ({"dt", "dd"}, {"dl"}),
+    "tr": ({"tr"}, {"table", "thead", "tbody", "tfoot"}),
+    "td": ({"td", "th"}, {"tr", "table"}),
+    "th": ({"td", "th"}, {"tr", "table"}),
+    "option": ({"option"}, {"select", "datalist", "optgroup"}),
+}
+# Start tags that close an open <p> (a paragraph can't contain blocks)
+CLOSES_P = (BLOCK_TAGS - {"br", "body"}) | {"aside", "details", "fieldset", "footer", "form", "header", "menu", "nav"}
+P_BOUNDARY = {"button", "table", "td", "th", "caption", "body", "html"}
+
+PRE_MARK = "\x00"
+
+DEFAULT_MAX_CHARS = 8000
+DEFAULT_MAX_LINKS = 50
+
+_SPACES = re.compile(r"[ \t\r\f\v\n]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_COMPOUND = re.compile(r"^([a-zA-Z][a-zA-Z0-9-]*|\*)?((?:[#.][\w-]+)*)$")
+
+
+class Node:
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag: str, attrs: dict, parent: "Node | None" = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+
+    def iter(self):
+        """Yield this node and every element below it, depth first."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed([c for c in node.children if isinstance(c, Node)]))
+
+    def text(self) -> str:
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return _SPACES.sub(" ", "".join(parts)).strip()
+
+
+class _TreeBuilder(HTMLParser):
+    """Build a light DOM, dropping SKIP_TAGS subtrees while parsing."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#root", {})
+        self.current = self.root
+        self.open = Counter()  # open elements by tag, so closing never scans the stack in vain
+        self.skip_depth = 0
+        self.title = ""
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        if self.skip_depth:
+            if tag not in VOID_TAGS:
+                self.skip_depth += 1
+            return
+        if tag in SKIP_TAGS:
+            self.skip_depth = 1
+            return
+        # Without this every unclosed <p>/<li> would nest inside the previous one
+        if tag in CLOSES_P:
+            self._close_implied({"p"}, P_BOUNDARY)
+        if tag in IMPLIED_END:
+            self._close_implied(*IMPLIED_END[tag])
+        node = Node(tag, {k: (v or "") for k, v in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+            self.open[tag] += 1
+
+    def _close(self, node: Node):
+        """Close node and every element still open inside it."""
+        while self.current is not node:
+            self.open[self.current.tag] -= 1
+            self.current = self.current.parent
+        self.open[node.tag] -= 1
+        self.current = node.parent
+
+    def _close_implied(self, tags: set, boundary: set):
+        if not any(self.open[t] for t in tags):
+            return
+        node = self.current
+        while node.parent is not None and node.tag not in boundary:
+            if node.tag in tags:
+                self._close(node)
+                return
+            node = node.parent
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.skip_depth and tag not in SKIP_TAGS:
+            self.current.children.append(Node(tag, {k: (v or "") for k, v in attrs}, self.current))
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if self.skip_depth:
+            if tag not in VOID_TAGS:
+                self.skip_depth -= 1
+            return
+        # Close up to the matching open element; ignore stray end tags
+        if not self.open[tag]:
+            return
+        node = self.current
+        while node.tag != tag:
+            node = node.parent
+        self._close(node)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        if not self.skip_depth:
+            self.current.children.append(data)
+
+
+def _is_boilerplate(node: Node) -> bool:
+    if node.tag in BOILERPLATE_TAGS:
+        return True
+    if node.attrs.get("aria-hidden") == "true" or "hidden" in node.attrs:
+        return True
+    hint = f"{node.attrs.get('class', '')} {node.attrs.get('id', '')} {node.attrs.get('role', '')}"
+    return node.attrs.get("role") in ("navigation", "banner", "contentinfo") or bool(BOILERPLATE_HINT.search(hint))
+
+
+def _strip_boilerplate(root: Node):
+    for node in list(root.iter()):
+        node.children = [c for c in node.children if isinstance(c, str) or not _is_boilerplate(c)]
+
+
+def _parse_selector(selector: str) -> list[list[tuple]]:
+    """
+    Parse the supported CSS subset: tag, #id, .class, compounds of those,
+    descendant combinators and comma-separated lists.
+    """
+    groups = []
+    for group in selector.split(","):
+        steps = []
+        for compound in group.split():
+            m = _COMPOUND.match(compound)
+            if not m:
+                raise ValueError(f"Unsupported selector '{compound}' (use tag, #id, .class and descendant combinations).")
+            tag = (m.group(1) or "*").lower()
+            ids = re.findall(r"#([\w-]+)", m.group(2))
+            classes = re.findall(r"\.([\w-]+)", m.group(2))
+            steps.append((tag, ids, classes))
+        if not steps:
+            raise ValueError("Empty selector.")
+        groups.append(steps)
+    return groups
+
+
+def _matches_step(node: Node, step: tuple) -> bool:
+    tag, ids, classes = step
+    if tag != "*" and node.tag != tag:
+        return False
+    if ids and node.attrs.get("id") not in ids:
+        return False
+    node_classes = node.attrs.get("class", "").split()
+    return all(c in node_classes for c in classes)
+
+
+def _matches(node: Node, steps: list[tuple]) -> bool:
+    if not _matches_step(node, steps[-1]):
+        return False
+    remaining = steps[:-1]
+    ancestor = node.parent
+    while remaining and ancestor is not None:
+        if _matches_step(ancestor, remaining[-1]):
+            remaining = remaining[:-1]
+        ancestor = ancestor.parent
+    return not remaining
+
+
+def select(root: Node, selector: str) -> list[Node]:
+    """Return the outermost elements matching a (simple) CSS selector."""
+    groups = _parse_selector(selector)
+    found = []
+    found_ids = set()  # id() of every match, so nested ones are skipped with one walk up
+    for node in root.iter():
+        if node is root or not any(_matches(node, steps) for steps in groups):
+            continue
+        found_ids.add(id(node))
+        if not any(id(a) in found_ids for a in _ancestors(node)):
+            found.append(node)
+    return found
+
+
+def _ancestors(node: Node):
+    node = node.parent
+    while node is not None:
+        yield node
+        node = node.parent
+
+
+def _text_lengths(root: Node) -> dict[int, int]:
+    """
+    Approximate len(node.text()) for every element, keyed by id(node), in
+    one pass (calling text() per node is quadratic on deeply nested pages).
+    """
+    lengths = {}
+    order = list(root.iter())
+    for node in reversed(order):  # children before parents
+        total = 0
+        for child in node.children:
+            if isinstance(child, str):
+                total += len(_SPACES.sub(" ", child).strip())
+            else:
+                total += lengths[id(child)]
+        lengths[id(node)] = total
+    return lengths
+
+
+def _main_content(root: Node) -> Node:
+    """
+    Readability-style pick of the main content element: an explicit
+    <main>/<article>/role=main if it holds real text, otherwise the
+    container that accumulates the most paragraph text.
+    """
+    lengths = _text_lengths(root)
+    explicit = [
+        n for n in root.iter()
+        if n.tag in ("main", "article") or n.attrs.get("role") == "main"
+    ]
+    if explicit:
+        best = max(explicit, key=lambda n: lengths[id(n)])
+        if lengths[id(best)] >= 200:
+            return best
+
+    scores = {}
+    for node in root.iter():
+        if node.tag not in ("p", "pre", "blockquote", "li"):
+            continue
+        length = lengths[id(node)]
+        if length < 25:
+            continue
+        score = 1 + min(length, 1000) / 100
+        parent = node.parent
+        for weight in (1.0, 0.5):
+            while parent is not None and parent.tag not in CONTAINER_TAGS:
+                parent = parent.parent
+            if parent is None:
+                break
+            entry = scores.setdefault(id(parent), [parent, 0.0])
+            entry[1] += score * weight
+            parent = parent.parent
+
+    if scores:
+        return max(scores.values(), key=lambda item: item[1])[0]
+
+    body = next((n for n in root.iter() if n.tag == "body"), None)
+    return body or root
+
+
+class _Renderer:
+    def __init__(self, base_url: str, markdown: bool):
+        self.base_url = base_url
+        self.markdown = markdown
+        self.out = []
+        self.links = {}  # url -> (index, text)
+
+    def link_ref(self, href: str, text: str) -> int | None:
+        url = urljoin(self.base_url, href)
+        if urlparse(url).scheme not in ("http", "https"):
+            return None
+        if url not in self.links:
+            self.links[url] = (len(self.links) + 1, text)
+        return self.links[url][0]
+
+    def render(self, node: Node, list_depth: int = 0):
+        # An explicit stack of (node, list depth, closing) so deep nesting can't hit the recursion limit
+        stack = [(child, list_depth, False) for child in reversed(node.children)]
+        while stack:
+            child, list_depth, closing = stack.pop()
+            if closing:
+                self._close(child.tag)
+                continue
+            if isinstance(child, str):
+                self.out.append(_SPACES.sub(" ", child))
+                continue
+
+            tag = child.tag
+            if tag == "pre":
+                # Keep preformatted lines verbatim (marked so text() leaves them alone)
+                code = "\n".join(PRE_MARK + line for line in "".join(_raw_text(child)).strip("\n").split("\n"))
+                fence = "```\n" if self.markdown else ""
+                self.out.append(f"\n\n{fence}{code}\n{fence}\n" if fence else f"\n\n{code}\n\n")
+                continue
+            if tag == "a" and child.attrs.get("href"):
+                text = child.text()
+                ref = self.link_ref(child.attrs["href"], text)
+                if text:
+                    self.out.append(f" [{text}][{ref}] " if self.markdown and ref else f" {text} ")
+                continue
+            if tag == "img":
+                alt = child.attrs.get("alt", "").strip()
+                if alt and self.markdown:
+                    self.out.append(f" [image: {alt}] ")
+                continue
+
+            self._open(tag, list_depth)
+            stack.append((child, list_depth, True))
+            depth = list_depth + (tag in ("ul", "ol"))
+            stack.extend((c, depth, False) for c in reversed(child.children))
+
+    def _open(self, tag: str, list_depth: int):
+        if tag in BLOCK_TAGS:
+            self.out.append("\n")
+        if self.markdown:
+            if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+                self.out.append("\n" + "#" * int(tag[1]) + " ")
+            elif tag == "li":
+                self.out.append("  " * max(list_depth - 1, 0) + "- ")
+            elif tag == "blockquote":
+                self.out.append("> ")
+            elif tag in ("strong", "b"):
+                self.out.append("**")
+            elif tag in ("em", "i"):
+                self.out.append("_")
+            elif tag == "code":
+                self.out.append("`")
+        elif tag == "li":
+            self.out.append("- ")
+
+    def _close(self, tag: str):
+        if self.markdown:
+            if tag in ("strong", "b"):
+                self.out.append("**")
+            elif tag in ("em", "i"):
+                self.out.append("_")
+            elif tag == "code":
+                self.out.append("`")
+        if tag in ("td", "th"):
+            self.out.append(" | ")
+        if tag in BLOCK_TAGS and tag != "li":
+            self.out.append("\n\n" if tag in ("p", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "table") else "\n")
+
+    def text(self) -> str:
+        lines = []
+        for line in "".join(self.out).split("\n"):
+            if line.startswith(PRE_MARK):
+                lines.append(line[len(PRE_MARK):].rstrip())
+            else:
+                lines.append(_SPACES.sub(" ", line).strip())
+        return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _raw_text(node: Node):
+    stack = list(reversed(node.children))
+    while stack:
+        child = stack.pop()
+        if isinstance(child, str):
+            yield child
+        else:
+            stack.extend(reversed(child.children))
+
+
+def _truncate(text: str, max_chars: int) -> tuple[str, bool]:
+    if len(text) <= max_chars:
+        return text, False
+    cut = text.rfind("\n\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = text.rfind(" ", 0, max_chars)
+    if cut <= 0:
+        cut = max_chars
+    return text[:cut].rstrip() + "\n\n[... truncated]", True
+
+
+def _links_table(links: dict, max_links: int) -> str:
+    if not links:
+        return ""
+    rows = ["| # | text | url |", "|---|---|---|"]
+    for url, (idx, text) in list(links.items())[:max_links]:
+        label = (text or "").replace("|", "/")[:80]
+        rows.append(f"| {idx} | {label} | {url} |")
+    if len(links) > max_links:
+        rows.append(f"| ... | {len(links) - max_links} more | |")
+    return "\n".join(rows)
+
+
+def extract(
+    html: str,
+    base_url: str = "",
+    selector: str | None = None,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    max_links: int = DEFAULT_MAX_LINKS,
+    markdown: bool = False,
+) -> dict:
+    """
+    Extract the readable main content of an HTML document.
+
+    Scripts, styles and page chrome (nav, footers, cookie banners, ...) are
+    dropped. With a selector only the matching elements are used, otherwise
+    the main content block is detected heuristically. The text is cut to
+    max_chars and links are returned separately as a compact table.
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    root = builder.root
+
+    if selector:
+        scope = select(root, selector)
+        if not scope:
+            return {"error": f"No elements match selector '{selector}'."}
+    else:
+        _strip_boilerplate(root)
+        scope = [_main_content(root)]
+
+    renderer = _Renderer(base_url, markdown)
+    for node in scope:
+        renderer.render(node)
+        renderer.out.append("\n\n")
+
+    content, truncated = _truncate(renderer.text(), max_chars)
+
+    return {
+        "url": base_url,
+        "title": _SPACES.sub(" ", builder.title).strip(),
+        "format": "markdown" if markdown else "text",
+        "content": content,
+        "truncated": truncated,
+        "html_chars": len(html),
+        "links": _links_table(renderer.links, max_links),
+    }
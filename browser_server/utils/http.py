@@ -0,0 +1,123 @@
+import re
+import time
+from urllib.parse import urljoin
+
+import httpx
+
+from .safety import validate_url
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+FETCH_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+MAX_REDIRECTS = 5
+# Bodies larger than this are cut off; pages that big need the browser anyway
+MAX_BYTES = 5 * 1024 * 1024
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/130.0 Safari/537.36"
+)
+
+_client: httpx.AsyncClient | None = None
+
+_TAGS = re.compile(r"<[^>]+>")
+_SCRIPT_STYLE = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_SPA_ROOT = re.compile(
+    r"<div[^>]+id=[\"'](root|app|__next|__nuxt|svelte)[\"'][^>]*>\s*</div>"
+    r"|\bng-app\b|\bng-version=|data-reactroot",
+    re.IGNORECASE,
+)
+_NOSCRIPT_HINT = re.compile(r"(enable|requires?) javascript", re.IGNORECASE)
+
+
+class FetchError(Exception):
+    """Raised when a page cannot be fetched over plain HTTP."""
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared client so connections are kept alive across calls."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=HTTP2,
+            timeout=FETCH_TIMEOUT,
+            follow_redirects=False,  # every hop is checked with validate_url
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+            },
+        )
+    return _client
+
+
+async def fetch(url: str, headers: dict | None = None) -> dict:
+    """
+    GET a URL, following redirects only to URLs that pass validate_url.
+    Returns url, status, headers, html, truncated and elapsed_ms.
+    Raises FetchError when a hop is blocked or the request fails.
+    """
+    client = get_client()
+    start = time.perf_counter()
+
+    for _ in range(MAX_REDIRECTS + 1):
+        try:
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.is_redirect:
+                    target = urljoin(url, response.headers.get("location", ""))
+                    is_safe, result = validate_url(target)
+                    if not is_safe:
+                        raise FetchError(f"Redirect blocked: {result}")
+                    url = result
+                    continue
+
+                body = bytearray()
+                truncated = False
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > MAX_BYTES:
+                        truncated = True
+                        break
+
+                return {
+                    "url": str(response.url),
+                    "status": response.status_code,
+                    "headers": dict(response.headers),
+                    "html": bytes(body[:MAX_BYTES]).decode(response.encoding or "utf-8", errors="replace"),
+                    "truncated": truncated,
+                    "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                }
+        except httpx.HTTPError as e:
+            raise FetchError(f"{type(e).__name__}: {e}") from e
+
+    raise FetchError(f"Too many redirects (>{MAX_REDIRECTS}).")
+
+
+def needs_javascript(result: dict) -> str | None:
+    """
+    Guess whether a fetched page only renders properly in a browser.
+    Returns the reason, or None when the static HTML is good enough.
+    """
+    if result["status"] >= 400:
+        return f"HTTP {result['status']}"
+
+    content_type = result["headers"].get("content-type", "")
+    if "html" not in content_type:
+        return f"non-HTML content ({content_type or 'unknown type'})"
+
+    html = result["html"]
+    visible = _TAGS.sub(" ", _SCRIPT_STYLE.sub(" ", html))
+    visible_chars = len(" ".join(visible.split()))
+    script_count = html.lower().count("<script")
+
+    if _SPA_ROOT.search(html) and visible_chars < 1000:
+        return "client-side rendered app shell"
+    if visible_chars < 200 and script_count > 0:
+        return "almost no text without scripts"
+    if visible_chars < 500 and _NOSCRIPT_HINT.search(html):
+        return "page asks for JavaScript"
+    return None
@@ -1,5 +1,10 @@
+import os
+import pickle
+import posixpath
 import re
-from urllib.parse import urlparse
+import sys
+import time
+from pathlib import Path
 
 # Blocked TLDs (common malicious domains)
 BLOCKED_TLDS = {
@@ -19,42 +24,200 @@ DANGEROUS_EXT = {
     ".js", ".jar", ".zip", ".rar", ".7z", ".dmg", ".pkg"
 }
 
+# Extra blocked domains, one per line (hosts-file lines like "0.0.0.0 example.com" work too).
+# Blocking a domain also blocks its subdomains.
+BLOCKLIST_DIR = Path(os.environ.get("BROWSER_BLOCKLIST_DIR", Path(__file__).parent.parent / "blocklists"))
+INDEX_FILE = ".index.pickle"
+# How often (seconds) the list files are checked for changes
+RELOAD_INTERVAL = 5.0
 
-def validate_url(url: str) -> tuple[bool, str]:
+_NON_ASCII = re.compile(r"[^\x00-\x7F]")
+_HOSTS_PREFIXES = {"0.0.0.0", "127.0.0.1", "::", "::1"}
+
+
+def normalize_domain(domain: str) -> str:
+    """Lowercase, strip wildcards and trailing dots, and IDNA-encode unicode labels."""
+    domain = domain.strip().lower().lstrip("*.").rstrip(".")
+    if not domain.isascii():
+        try:
+            domain = domain.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    return domain
+
+
+def _parse_list(path: Path) -> set[str]:
+    domains = set()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) > 1 and parts[0] in _HOSTS_PREFIXES:
+                parts = parts[1:]
+            for part in parts:
+                domain = normalize_domain(part)
+                if domain and domain != "localhost":
+                    domains.add(domain)
+    return domains
+
+
+def _split_https(url: str) -> tuple[str, str]:
     """
-    Validates a URL before allowing the browser to open it.
-    Returns (True, url) if safe, or (False, reason) if blocked.
+    Return (host, path) of an https:// URL. A hand-rolled split is several
+    times faster than urlsplit and this runs for every URL checked.
     """
+    end = len(url)
+    for sep in "/?#":
+        i = url.find(sep, 8)
+        if i != -1 and i < end:
+            end = i
+    netloc = url[8:end]
+
+    rest = url[end:]
+    cut = len(rest)
+    for sep in "?#":
+        i = rest.find(sep)
+        if i != -1 and i < cut:
+            cut = i
+    path = rest[:cut]
+
+    netloc = netloc.rpartition("@")[2]
+    if netloc.startswith("["):  # IPv6 literal
+        host = netloc[1:netloc.find("]")] if "]" in netloc else netloc
+    else:
+        host = netloc.partition(":")[0]
+    return host.lower(), path
+
+
+class UrlChecker:
+    """
+    Precompiled URL checks.
+
+    Domain and TLD rules live in frozensets and a host is matched by
+    walking its dot-separated suffixes, so cost depends on the number of
+    labels in the host, not on the size of the lists. Lists from
+    BLOCKLIST_DIR are compiled into a pickled index next to them, which is
+    rebuilt only when a list file changes and reloaded automatically.
+    """
+
+    def __init__(self, blocklist_dir: Path = BLOCKLIST_DIR):
+        self.blocklist_dir = blocklist_dir
+        self.blocked_domains: frozenset[str] = frozenset()
+        self.shorteners = frozenset(normalize_domain(d) for d in SHORTENERS)
+        self.blocked_tlds = frozenset(BLOCKED_TLDS)
+        self.dangerous_ext = frozenset(DANGEROUS_EXT)
+        self._signature = None
+        self._next_check = 0.0
+        self.reload()
 
-    url = url.strip()
+    def _list_signature(self) -> tuple:
+        if not self.blocklist_dir.is_dir():
+            return ()
+        return tuple(sorted(
+            (p.name, p.stat().st_size, p.stat().st_mtime_ns)
+            for p in self.blocklist_dir.glob("*.txt")
+        ))
 
-    # Must be HTTPS (no plain http allowed)
-    if not url.startswith("https://"):
-        return False, "Only HTTPS URLs are allowed."
+    def reload(self, force: bool = False):
+        """Load the blocklist index, rebuilding it if any list file changed."""
+        signature = self._list_signature()
+        if signature == self._signature and not force:
+            return
 
-    parsed = urlparse(url)
-    domain = parsed.netloc.lower()
+        index_path = self.blocklist_dir / INDEX_FILE
+        domains = None
+        if not force and index_path.exists():
+            try:
+                with open(index_path, "rb") as f:
+                    stored_signature, stored = pickle.load(f)
+                if stored_signature == signature:
+                    domains = stored
+            except Exception:
+                domains = None
 
-    # Block URL shorteners
-    if domain in SHORTENERS:
-        return False, f"Blocked shortened URL: {domain}"
+        if domains is None:
+            domains = set()
+            for name, _, _ in signature:
+                domains |= _parse_list(self.blocklist_dir / name)
+            domains = frozenset(domains)
+            if signature:
+                tmp = index_path.with_suffix(".tmp")
+                try:
+                    with open(tmp, "wb") as f:
+                        pickle.dump((signature, domains), f, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp, index_path)
+                except OSError as e:
+                    # e.g. a read-only blocklist dir: use the lists anyway, just parse them again next start
+                    print(f"[Safety] Could not write {index_path}: {e}", file=sys.stderr)
 
-    # Block dangerous TLDs
-    tld = domain.split(".")[-1]
-    if tld in BLOCKED_TLDS:
-        return False, f"Domain TLD '.{tld}' is not allowed."
+        self.blocked_domains = domains
+        self._signature = signature
 
-    # Block long suspicious URLs
-    if len(url) > 2048:
-        return False, "URL too long (possible phishing or tracking link)."
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + RELOAD_INTERVAL
+            try:
+                self.reload()
+            except OSError:
+                pass  # keep serving the last good index
 
-    # Block dangerous downloads
-    for ext in DANGEROUS_EXT:
-        if parsed.path.lower().endswith(ext):
+    def check(self, url: str) -> tuple[bool, str]:
+        self._maybe_reload()
+
+        url = url.strip()
+
+        # Must be HTTPS (no plain http allowed)
+        if not url.startswith("https://"):
+            return False, "Only HTTPS URLs are allowed."
+
+        # Block long suspicious URLs
+        if len(url) > 2048:
+            return False, "URL too long (possible phishing or tracking link)."
+
+        host, path = _split_https(url)
+        host = normalize_domain(host)
+
+        # Walk the host's suffixes: a.b.example.com, b.example.com, example.com, com
+        suffix = host
+        while True:
+            if suffix in self.shorteners:
+                return False, f"Blocked shortened URL: {suffix}"
+            if suffix in self.blocked_domains:
+                return False, f"Domain '{suffix}' is on the blocklist."
+            dot = suffix.find(".")
+            if dot < 0:
+                break
+            suffix = suffix[dot + 1:]
+
+        # Block dangerous TLDs (the last suffix is the TLD)
+        if suffix in self.blocked_tlds:
+            return False, f"Domain TLD '.{suffix}' is not allowed."
+
+        # Block dangerous downloads
+        # ;params (like ;jsessionid=...) aren't part of the file name
+        name = posixpath.basename(path.lower()).partition(";")[0]
+        ext = posixpath.splitext(name)[1]
+        if not ext and name.startswith("."):
+            ext = name  # splitext treats dot-only names like "/.js" as having no extension
+        if ext in self.dangerous_ext:
             return False, f"Blocked file download attempt: {ext}"
 
-    # Detect suspicious Unicode (homograph attacks)
-    if re.search(r"[^\x00-\x7F]", url):
-        return False, "URL contains suspicious Unicode characters."
+        # Detect suspicious Unicode (homograph attacks)
+        if _NON_ASCII.search(url):
+            return False, "URL contains suspicious Unicode characters."
+
+        return True, url
 
-    return True, url
+
+checker = UrlChecker()
+
+
+def validate_url(url: str) -> tuple[bool, str]:
+    """
+    Validates a URL before allowing the browser to open it.
+    Returns (True, url) if safe, or (False, reason) if blocked.
+    """
+    return checker.check(url)
@@ -1,11 +1,16 @@
-import ollama
 import json
 
+from .response_cache import ResponseCache, cache_key, ENABLED as CACHE_ENABLED
+
+OPTIONS = {'temperature': 0.0}
+
 class OllamaAI:
-    def __init__(self, model="qwen2.5:latest"):
+    def __init__(self, model="qwen2.5:latest", cache: ResponseCache | None = None):
         self.model = model
+        # temperature 0 makes responses deterministic, so identical requests can be replayed
+        self.cache = cache if cache is not None else (ResponseCache() if CACHE_ENABLED else None)
 
-    def generate(self, messages, tools):
+    def generate(self, messages, tools, use_cache=True):
         # 1. Base Instructions (The "Personality")
         system_rules = """
 You are a helpful coding assistant. 
@@ -67,10 +72,22 @@ CORE RULES:
                 # If there was a specific system instruction (like the summarization prompt), add it as 'user' or 'system' secondary
                 final_messages.append(m)
 
-        # 4. Call Ollama
+        # 4. Reuse an earlier answer to the exact same request
+        key = None
+        if use_cache and self.cache is not None:
+            key = cache_key(self.model, final_messages, OPTIONS)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return {"message": cached, "cached": True}
+
+        # 5. Call Ollama (imported here: it pulls in httpx/pydantic, which slows startup)
         try:
-            response = ollama.chat(model=self.model, messages=final_messages , options={'temperature':0.0})
+            import ollama
+
+            response = ollama.chat(model=self.model, messages=final_messages , options=OPTIONS)
 
+            if key is not None:
+                self.cache.put(key, {"role": "assistant", "content": response.message.content})
             return response
         except Exception as e:
             return {"message": {"content": f"Error: {str(e)}", "role": "assistant"}}
\ No newline at end of file
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+CACHE_PATH = Path(os.environ.get("LLM_CACHE_PATH", Path(__file__).resolve().parent.parent / "llm_cache.db"))
+MAX_CACHE_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", "50")) * 1024 * 1024)
+# Set LLM_CACHE=0 to turn the cache off entirely
+ENABLED = os.environ.get("LLM_CACHE", "1") != "0"
+
+
+def cache_key(model: str, messages: list[dict], options: dict) -> str:
+    """Content address of a request: the model, the final message list and the options."""
+    payload = json.dumps([model, messages, options], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class ResponseCache:
+    """
+    Deterministic LLM responses in SQLite, keyed by cache_key.
+    Only worth it with temperature 0, where the same input gives the same
+    output. Least recently used entries are evicted past max_bytes.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self._db.commit()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, message: dict):
+        body = zlib.compress(json.dumps(message).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, body, len(body), now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
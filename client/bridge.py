@@ -1,24 +1,105 @@
+import argparse
 import asyncio
+import builtins
 import json
 import sys
+import time
 import traceback
-from mcp_client import MCPClient
+from contextlib import contextmanager
 
 def send_json(obj):
     print(json.dumps(obj, ensure_ascii=True),flush=True)
     sys.stdout.flush()
 
-async def run_bridge():
-    client = MCPClient()
+
+class StartupProfile:
+    """Phase and import timings for --profile-startup (a no-op otherwise)."""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.phases: list[tuple[str, float, float]] = []
+        self.imports: dict[str, float] = {}
+        self._import = builtins.__import__
+        if enabled:
+            builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            # Cumulative: a module's time includes everything it imported first
+            self.imports.setdefault(name, time.perf_counter() - start)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start - self.start, time.perf_counter() - start))
+
+    def mark(self, name: str):
+        self.phases.append((name, time.perf_counter() - self.start, 0.0))
+
+    def dump(self, target: str):
+        if not self.enabled:
+            return
+        builtins.__import__ = self._import
+        report = {
+            "phases": [{"phase": n, "at_ms": round(at * 1000, 1), "ms": round(d * 1000, 1)} for n, at, d in self.phases],
+            "imports": [
+                {"module": n, "cumulative_ms": round(d * 1000, 1)}
+                for n, d in sorted(self.imports.items(), key=lambda item: -item[1])[:25]
+            ],
+        }
+        if target == "-":
+            print("[Startup] phase                          at (ms)    took (ms)", file=sys.stderr)
+            for p in report["phases"]:
+                print(f"[Startup] {p['phase']:<30} {p['at_ms']:>8} {p['ms']:>12}", file=sys.stderr)
+            print("[Startup] slowest imports (cumulative ms)", file=sys.stderr)
+            for i in report["imports"]:
+                print(f"[Startup] {i['module']:<40} {i['cumulative_ms']:>8}", file=sys.stderr)
+        else:
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+
+async def run_bridge(profile_target: str | None = None):
+    profile = StartupProfile(profile_target is not None)
+
+    # Tell the app we're alive before anything slow happens; capabilities follow as servers connect
     print("READY", flush=True)
+    profile.mark("READY sent")
+
+    with profile.phase("import mcp_client"):
+        from mcp_client import MCPClient
+    with profile.phase("client init"):
+        client = MCPClient()
+
+    connected = set()
 
     def handle_event(event :dict):
+        if event.get("type") == "capabilities":
+            for server in event["servers"]:
+                if server not in connected:
+                    connected.add(server)
+                    profile.mark(f"server ready: {server}")
         send_json(event)
     # bridge.py
 
 
+    async def load_history():
+        with profile.phase("history load"):
+            await asyncio.to_thread(lambda: client.conversation_id)
+
     try:    
-        await client.connect_all(event_handler=handle_event)
+        # Servers connect concurrently, and the history loads meanwhile
+        with profile.phase("connect all servers"):
+            await asyncio.gather(client.connect_all(event_handler=handle_event), load_history())
 
     except Exception as e:
         send_json({
@@ -29,10 +110,25 @@ async def run_bridge():
         return 1
     
     send_json({"status": "connected"})
+    profile.mark("connected")
+    profile.dump(profile_target)
+
 
+    tasks = set()
+
+    async def run_query(query: str, conversation_id: str, plan: bool | None):
+        try :
+            result = await client.process(query, event_handler=handle_event, conversation_id=conversation_id, plan=plan)
+            if isinstance(result, (dict, list)):
+                send_json({"type": "response", "ok": True, "response": result, "conversation_id": conversation_id})
+            else:
+                send_json({"type": "response", "ok": True, "response": str(result), "conversation_id": conversation_id})
+        except Exception as e:
+            send_json({"ok": False, "error": str(e), "trace": traceback.format_exc(), "conversation_id": conversation_id})
 
     while True:
-        line = sys.stdin.readline()
+        # Read stdin off the event loop so queries keep running while we wait
+        line = await asyncio.to_thread(sys.stdin.readline)
         if not line:
             break 
 
@@ -51,9 +147,25 @@ async def run_bridge():
             })
             continue
 
-        if data.get("cmd") == "__shutdown__":
+        cmd = data.get("cmd")
+        if cmd == "__shutdown__":
             break
 
+        if cmd in ("new_conversation", "switch_conversation", "list_conversations"):
+            try:
+                if cmd == "new_conversation":
+                    client.new_conversation(data.get("title"))
+                elif cmd == "switch_conversation":
+                    client.switch_conversation(data.get("conversation_id", ""))
+                send_json({
+                    "type": "conversations",
+                    "current": client.conversation_id,
+                    "conversations": client.list_conversations(),
+                })
+            except Exception as e:
+                send_json({"ok": False, "error": str(e)})
+            continue
+
         query = data.get("query")
 
         if query is None:
@@ -63,16 +175,17 @@ async def run_bridge():
             })
             continue
 
-        try :
-            result = await client.process(query, event_handler=handle_event)
-            if isinstance(result, (dict, list)):
-                send_json({"type": "response", "ok": True, "response": result})
-            else:
-                send_json({"type": "response", "ok": True, "response": str(result)})
-        except Exception as e:
-            send_json({"ok": False, "error": str(e), "trace": traceback.format_exc()})
-
+        # Each query runs in its own task; different conversations don't block each other
+        conversation_id = data.get("conversation_id") or client.conversation_id
+        # "mode": "plan" / "step" overrides plan_mode from server.json for this query
+        mode = data.get("mode")
+        plan = None if mode is None else mode == "plan"
+        task = asyncio.create_task(run_query(query, conversation_id, plan))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
 
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     try : 
         await client.cleanup()
@@ -84,4 +197,13 @@ async def run_bridge():
     return 0
 
 if __name__ == "__main__":
-    asyncio.run(run_bridge())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="stdin/stdout bridge between the app and the MCP client")
+    parser.add_argument(
+        "--profile-startup",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="print phase and import timings to stderr, or write them to FILE as JSON",
+    )
+    cli = parser.parse_args()
+    asyncio.run(run_bridge(cli.profile_startup))
\ No newline at end of file
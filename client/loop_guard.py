@@ -0,0 +1,68 @@
+import hashlib
+import json
+
+# Calls to tools with these name prefixes change state, so earlier results may be stale afterwards.
+# Navigation counts too: extract_text etc. without a page_id read whatever page was opened last.
+MUTATING_PREFIXES = (
+    "write", "delete", "remove", "create", "copy", "move", "rename", "close",
+    "open", "navigate", "goto", "take",
+)
+# The same call with the same result this many times in one request counts as a loop
+MAX_REPEATS = 3
+# Longest repeating pattern of calls that is checked for (A B A B, A B C A B C, ...)
+MAX_CYCLE = 3
+
+
+def fingerprint(tool: str, args: dict) -> str:
+    return f"{tool} {json.dumps(args, sort_keys=True, default=str)}"
+
+
+class LoopGuard:
+    """
+    Tracks the tool calls of one request to catch wasted steps.
+
+    Exact repeats of a read-only call are answered from the earlier
+    observation instead of running the tool again. A call that keeps
+    returning the same result, or a short sequence of calls that keeps
+    repeating, is reported as a loop so the request can end early.
+    """
+
+    def __init__(self):
+        self.observations: dict[str, tuple[str, bool]] = {}  # key -> (observation, ok)
+        self.trail: list[tuple[str, str]] = []
+        self.skipped = 0
+
+    def lookup(self, tool: str, args: dict) -> tuple[str, bool] | None:
+        """The earlier (observation, ok) for this exact call, if it is still valid."""
+        earlier = self.observations.get(fingerprint(tool, args))
+        if earlier is not None:
+            self.skipped += 1
+        return earlier
+
+    def record(self, tool: str, args: dict, observation: str, ok: bool = True) -> str | None:
+        """Remember a call and its result. Returns a diagnostic when a loop is detected."""
+        key = fingerprint(tool, args)
+        if tool.rsplit(".", 1)[-1].startswith(MUTATING_PREFIXES):
+            self.observations.clear()
+        self.observations[key] = (observation, ok)
+
+        digest = hashlib.blake2b(observation.encode("utf-8", "replace"), digest_size=8).hexdigest()
+        self.trail.append((key, digest))
+
+        if self.trail.count(self.trail[-1]) >= MAX_REPEATS:
+            return f"'{tool}' was called {MAX_REPEATS} times with the same arguments and got the same result each time."
+
+        for size in range(2, MAX_CYCLE + 1):
+            if len(self.trail) >= 2 * size and self.trail[-size:] == self.trail[-2 * size:-size]:
+                tools = " -> ".join(k.split(" ", 1)[0] for k, _ in self.trail[-size:])
+                return f"The same {size} calls ({tools}) were repeated with identical results."
+        return None
+
+    def stats(self, steps: int, max_steps: int, stopped_early: bool) -> dict:
+        return {
+            "steps": steps,
+            "tool_calls": len(self.trail),
+            "duplicate_calls_skipped": self.skipped,
+            "loop_detected": stopped_early,
+            "steps_saved": max_steps - steps if stopped_early else 0,
+        }
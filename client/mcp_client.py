@@ -1,15 +1,70 @@
-from typing import Optional , Dict , Callable, Any
+from __future__ import annotations
+
+from typing import Optional , Dict , Callable, Any, TYPE_CHECKING
 from contextlib import AsyncExitStack
 import json
 import re
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
 from pathlib import Path
 from ai.ollama import OllamaAI
+from session_store import SessionStore, Conversation
+from loop_guard import LoopGuard
+from observations import FileViews
+from planner import PLAN_PROMPT, PlanError, PlanStep, parse_plan, substitute
 import sys
 import asyncio
 import uuid
 import time
+from datetime import timedelta
+
+# mcp (and the ollama/httpx stack) take most of a second to import, so they are
+# imported where first used; the bridge can answer READY before that
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+# Defaults for server.json settings (seconds / calls)
+DEFAULT_TOOL_TIMEOUT = 60
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_REQUEST_TIMEOUT = 600
+MAX_STEPS = 15
+# After cancelling a call, how long to wait for the server's cancellation response in the background
+CANCEL_GRACE = 30
+# Tools whose text result is content (file text, page HTML), so a leading "Error" means nothing;
+# other tools report failures as "Error..." strings as well as through isError
+RAW_TEXT_TOOLS = {"read_file", "get_page_content"}
+# _meta key that tags each tools/call with our own id, so RequestTap can find its JSON-RPC id
+CALL_ID_META = "clientCallId"
+
+
+class RequestTap:
+    """
+    Wraps a session's write stream and records the JSON-RPC id of every
+    tools/call sent through it, keyed by the CALL_ID_META value in its
+    _meta. The session allocates ids internally; this is how call_tool
+    learns them, so any in-flight call can be cancelled on the server.
+    """
+
+    def __init__(self, stream, request_ids: dict):
+        self.stream = stream
+        self.request_ids = request_ids
+
+    async def send(self, session_message):
+        root = session_message.message.root
+        if getattr(root, "method", None) == "tools/call":
+            call_id = ((root.params or {}).get("_meta") or {}).get(CALL_ID_META)
+            if call_id:
+                self.request_ids[call_id] = root.id
+        await self.stream.send(session_message)
+
+    async def __aenter__(self):
+        await self.stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self.stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
 
 def get_client_root() -> Path:
     """
@@ -49,41 +104,112 @@ class MCPClient:
         self.ai = OllamaAI()
         self.sessions: Dict[str,ClientSession] = {}
         self.tool_cache: Dict[str, list[Any]] = {}
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.request_timeout = self.config.get("request_timeout", DEFAULT_REQUEST_TIMEOUT)
+        self.plan_mode = self.config.get("plan_mode", False)
 
         self.exit_stack = AsyncExitStack()
+        self.connections: Dict[str, asyncio.Task] = {}
+        self.closing = asyncio.Event()
+        # JSON-RPC ids of in-flight tool calls, keyed by the call id in their _meta (see RequestTap)
+        self.request_ids: Dict[str, Any] = {}
 
 
         self.history_file = client_dir / "history.json"
-        self.history = self.load_memory()
+        self.sessions_file = client_dir / "sessions.db"
+        self.conversation_locks: Dict[str, asyncio.Lock] = {}
+        self.views: Dict[str, FileViews] = {}
+        # Opened on first use, so startup does not wait on disk (see load_memory)
+        self._store: SessionStore | None = None
+        self._conversation_id: str | None = None
+
+
+    @property
+    def store(self) -> SessionStore:
+        if self._store is None:
+            self._store = SessionStore(self.sessions_file)
+        return self._store
+
+
+    @property
+    def conversation_id(self) -> str:
+        if self._conversation_id is None:
+            self._conversation_id = self.load_memory()
+        return self._conversation_id
+
+
+    @conversation_id.setter
+    def conversation_id(self, value: str):
+        self._conversation_id = value
+
 
+    @property
+    def history(self) -> list[dict]:
+        """Recent messages of the current conversation."""
+        return self.store.get(self.conversation_id).messages
 
-    def load_memory(self):
-        """Load history from file if it exists."""
+
+    def load_memory(self) -> str:
+        """Pick the conversation to resume, importing a legacy history.json once."""
         if self.history_file.exists():
             try:
                 with open(self.history_file, "r") as f:
                     data = json.load(f)
-                    print(f"[Memory] Loaded {len(data)} previous messages.",file=sys.stderr)
-                    return data
+                conversation_id = self.store.create("Imported history")
+                conv = self.store.get(conversation_id)
+                conv.messages.extend(data)
+                self.store.save(conv)
+                self.history_file.rename(self.history_file.with_suffix(".json.imported"))
+                print(f"[Memory] Imported {len(data)} messages from history.json.",file=sys.stderr)
+                return conversation_id
             except Exception as e:
-                print(f"[Memory] Error loading file: {e}",file=sys.stderr)
-        return []
-    
+                print(f"[Memory] Error importing history.json: {e}",file=sys.stderr)
+
+        return self.store.latest() or self.store.create()
+
 
-    def save_memory(self):
-        """Save current history to file."""
+    def save_memory(self, conv: Conversation | None = None):
+        """Persist messages appended to a conversation (the current one by default)."""
         try:
-            with open(self.history_file, "w") as f:
-                json.dump(self.history, f, indent=2)
+            self.store.save(conv or self.store.get(self.conversation_id))
         except Exception as e:
-            print(f"[Memory] Error saving file: {e}",file=sys.stderr)
+            print(f"[Memory] Error saving conversation: {e}",file=sys.stderr)
 
 
-    def clear_memory(self):
+    def clear_memory(self, conv: Conversation | None = None):
         """Wipe the history."""
-        self.history = []
-        self.save_memory()
+        conv = conv or self.store.get(self.conversation_id)
+        self.store.replace(conv, [])
+        self.file_views(conv).reset()
         return "Memory cleared. I have forgotten everything."
+
+
+    def file_views(self, conv: Conversation) -> FileViews:
+        """Files the model has seen in a conversation, for diff-based re-reads."""
+        views = self.views.setdefault(conv.id, FileViews())
+        # Messages trimmed from the window (or not reloaded after eviction) are no longer visible
+        views.forget_before(conv.first_seq)
+        return views
+
+
+    def new_conversation(self, title: str | None = None) -> str:
+        """Start a new conversation and make it the current one."""
+        self.conversation_id = self.store.create(title or "New conversation")
+        return self.conversation_id
+
+
+    def switch_conversation(self, conversation_id: str) -> str:
+        if not self.store.exists(conversation_id):
+            raise ValueError(f"Unknown conversation '{conversation_id}'.")
+        self.conversation_id = conversation_id
+        return conversation_id
+
+
+    def list_conversations(self) -> list[dict]:
+        return [
+            {**c, "current": c["id"] == self.conversation_id}
+            for c in self.store.list_conversations()
+        ]
     
 
     def classify_intent(self, query: str) -> str:
@@ -180,10 +306,12 @@ class MCPClient:
     #     return servers
 
 
-    async def summarize_memory(self):
+    async def summarize_memory(self, conv: Conversation | None = None):
         """Compress the history to save space."""
+        conv = conv or self.store.get(self.conversation_id)
+        history = conv.messages
         # Only summarize if we actually have enough content to compress
-        if len(self.history) < 4:
+        if len(history) < 4:
             return "History is too short to summarize."
 
         print("[Memory] Auto-summarizing conversation to prevent overflow...",file=sys.stderr)
@@ -191,8 +319,8 @@ class MCPClient:
         # Strategy Keep the System Prompt (implied) + Last 2 turns (User/Assistant or Tool).
         # Compress everything older than that.
         # This ensures the 'immediate' context (like the question just asked) is never lost.
-        to_summarize = self.history[:-2] 
-        recent_context = self.history[-2:]
+        to_summarize = history[:-2] 
+        recent_context = history[-2:]
 
         summary_prompt = [
             {"role": "system", "content": "Summarize the following technical conversation. Preserve key technical details, file names, errors, and outcomes. Be concise."},
@@ -200,7 +328,7 @@ class MCPClient:
         ]
 
         # Call AI without tools for the summary
-        response = self.ai.generate(summary_prompt, []) 
+        response = await asyncio.to_thread(self.ai.generate, summary_prompt, []) 
         
         if isinstance(response, dict):
             summary_text = response["message"]["content"]
@@ -214,9 +342,10 @@ class MCPClient:
             {"role": "system", "content": f"PREVIOUS CONVERSATION SUMMARY: {summary_text}"},
         ] + recent_context
 
-        self.history = new_history
-        self.save_memory()
-        return f"Memory summarized. Reduced from {len(to_summarize) + 2} messages to {len(self.history)}."
+        self.store.replace(conv, new_history)
+        # Earlier file contents are gone from the history, so diffs against them would be useless
+        self.file_views(conv).reset()
+        return f"Memory summarized. Reduced from {len(to_summarize) + 2} messages to {len(history)}."
 
 
     @staticmethod
@@ -251,35 +380,23 @@ class MCPClient:
         return None
 
 
-    async def connect_to_server(self, server_name: str):
+    async def connect_to_server(self, server_name: str, event_handler=None):
         """Connect to an MCP server
 
         Args:
             server_name: Name of the server defined in servers.json
+
+        The connection lives in its own task (transports must be closed by
+        the task that opened them), so several servers can connect at once.
         """
         cfg = self.config["servers"][server_name]
-        project_root = get_project_root()
-        script_path = project_root / cfg["args"][0]
-        script_path = script_path.resolve()
-
-        final_args = [str(script_path)] + cfg["args"][1:]
-
-
-        server_params = StdioServerParameters(
-            command=cfg["command"],
-            args=final_args,
-            env=None
-        )
-
-        stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-        stdin, stdout = stdio_transport
-        session = await self.exit_stack.enter_async_context(ClientSession(stdin, stdout))
-
-        # Initialize THIS session (not self.session)
-        await session.initialize()
+        ready = asyncio.get_running_loop().create_future()
+        self.connections[server_name] = asyncio.create_task(self._hold_connection(server_name, ready))
+        session = await ready
 
         # STORE THE SESSION CORRECTLY
         self.sessions[server_name] = session
+        self.semaphores[server_name] = asyncio.Semaphore(cfg.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
 
         print(f"[Cache] Fetching tools for {server_name}...", file=sys.stderr)
         resp = await session.list_tools()
@@ -293,11 +410,81 @@ class MCPClient:
                 "parameters": tool.inputSchema,
                 "server": server_name
             })
+
+        # Capabilities grow as servers come up
+        self.emit_capabilities(event_handler)
+
+
+    async def _hold_connection(self, server_name: str, ready: asyncio.Future):
+        """Open the server's transport and session, then keep them open until cleanup()."""
+        from mcp import ClientSession, StdioServerParameters
+        from mcp.client.stdio import stdio_client
+
+        cfg = self.config["servers"][server_name]
+        try:
+            async with AsyncExitStack() as stack:
+                if "url" in cfg:
+                    # Shared server already running (e.g. main.py --transport streamable-http)
+                    transport = cfg.get("transport", "streamable-http")
+                    if transport == "sse":
+                        from mcp.client.sse import sse_client
+                        stdin, stdout = await stack.enter_async_context(sse_client(cfg["url"]))
+                    else:
+                        from mcp.client.streamable_http import streamablehttp_client
+                        stdin, stdout, _ = await stack.enter_async_context(streamablehttp_client(cfg["url"]))
+                else:
+                    project_root = get_project_root()
+                    script_path = project_root / cfg["args"][0]
+                    script_path = script_path.resolve()
+
+                    final_args = [str(script_path)] + cfg["args"][1:]
+
+
+                    server_params = StdioServerParameters(
+                        command=cfg["command"],
+                        args=final_args,
+                        env=None
+                    )
+
+                    stdio_transport = await stack.enter_async_context(stdio_client(server_params))
+                    stdin, stdout = stdio_transport
+
+                session = await stack.enter_async_context(ClientSession(stdin, RequestTap(stdout, self.request_ids)))
+
+                # Initialize THIS session (not self.session)
+                await session.initialize()
+
+                ready.set_result(session)
+                await self.closing.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e if isinstance(e, Exception) else RuntimeError(f"Connection to '{server_name}' was cancelled."))
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.sessions.pop(server_name, None)
     
     
     async def connect_all(self, event_handler=None):
-        for server_name in self.config["servers"]:
-            await self.connect_to_server(server_name)
+        """Connect every configured server concurrently. Raises only if none of them came up."""
+        names = list(self.config["servers"])
+        results = await asyncio.gather(
+            *(self.connect_to_server(name, event_handler) for name in names),
+            return_exceptions=True,
+        )
+
+        failures = {name: r for name, r in zip(names, results) if isinstance(r, BaseException)}
+        for name, error in failures.items():
+            print(f"[Connect] {name} failed: {error}", file=sys.stderr)
+            if event_handler:
+                event_handler({
+                    "type": "server_connection_failed",
+                    "server": name,
+                    "error": str(error),
+                    "timestamp": time.time(),
+                })
+        if failures and len(failures) == len(names):
+            raise next(iter(failures.values()))
 
         self.emit_capabilities(event_handler)
 
@@ -305,41 +492,187 @@ class MCPClient:
 
     async def cleanup(self):
         """Clean up resources"""
+        self.closing.set()
+        if self.connections:
+            await asyncio.gather(*self.connections.values(), return_exceptions=True)
+            self.connections.clear()
         await self.exit_stack.aclose()
 
 
-    async def call_tool(self, server_name: str, tool_name: str, args: dict):
-        """Call a tool on a specific server"""
+    def tool_timeout(self, server_name: str, tool_name: str) -> float:
+        """Per-tool timeout from server.json, falling back to the server's, then the default."""
+        cfg = self.config["servers"].get(server_name, {})
+        tool_timeouts = cfg.get("tool_timeouts", {})
+        return tool_timeouts.get(tool_name, cfg.get("timeout", DEFAULT_TOOL_TIMEOUT))
+
+
+    async def call_tool(
+        self,
+        server_name: str,
+        tool_name: str,
+        args: dict,
+        deadline: float | None = None,
+        on_progress: Callable[[dict], None] | None = None,
+    ):
+        """Call a tool on a specific server
+
+        Waits for a free slot of the server's semaphore, and raises
+        TimeoutError when the tool's timeout (or the request deadline, a
+        time.monotonic() value) runs out first.
+
+        Progress notifications are passed to on_progress as dicts with
+        progress, total, message and partial (the partial results so far).
+        Once the tool's stop_after limit from server.json is reached the call
+        is cancelled on the server and the partial results are returned.
+
+        A call that is cut short is always cancelled on the server and its
+        semaphore slot is freed at once. A call not sent yet (still queued for
+        a slot) is cancelled locally. One already sent is not, since that can break a
+        shared session: it waits in the background for the server's
+        cancellation response, which is dropped.
+        """
 
         if server_name not in self.sessions:
             raise ValueError(f"Server '{server_name}' is not connected.")
         
         session = self.sessions[server_name]
-        response = await session.call_tool(tool_name, args)
-        return response
+        timeout = self.tool_timeout(server_name, tool_name)
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            raise TimeoutError("No time left before the request deadline.")
+
+        from mcp import types
+
+        stop_after = self.config["servers"].get(server_name, {}).get("stop_after", {}).get(tool_name)
+        partial = []
+        enough = asyncio.Event()
+        call_id = uuid.uuid4().hex
+        semaphore = self.semaphores[server_name]
+        slot = {"acquired": False, "released": False}
+
+        def release_slot():
+            if slot["acquired"] and not slot["released"]:
+                slot["released"] = True
+                semaphore.release()
+
+        async def progress_callback(progress: float, total: float | None, message: str | None):
+            # Servers send {"message": ..., "partial": [...]} as the message; plain text works too
+            try:
+                update = json.loads(message) if message else {}
+            except json.JSONDecodeError:
+                update = {"message": message}
+            if not isinstance(update, dict):
+                update = {"message": message}
+            partial.extend(update.get("partial") or [])
+            if on_progress:
+                on_progress({
+                    "progress": progress,
+                    "total": total,
+                    "message": update.get("message", ""),
+                    "partial": partial,
+                })
+            if stop_after and len(partial) >= stop_after:
+                enough.set()
+
+        async def run():
+            await semaphore.acquire()
+            slot["acquired"] = True
+            try:
+                # The session's own read timeout ends the wait cleanly if the server never answers
+                return await session.call_tool(
+                    tool_name, args,
+                    read_timeout_seconds=timedelta(seconds=timeout + CANCEL_GRACE),
+                    progress_callback=progress_callback,
+                    meta={CALL_ID_META: call_id},
+                )
+            finally:
+                release_slot()
+                self.request_ids.pop(call_id, None)
+
+        task = asyncio.create_task(run())
+        waiter = asyncio.create_task(enough.wait())
+        try:
+            done, _ = await asyncio.wait({task, waiter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if task in done:
+                return task.result()
+
+            request_id = self.request_ids.get(call_id)
+            if request_id is None:
+                task.cancel()  # still queued for a slot, so never sent
+            else:
+                # Retrieve the late result (or error) so it isn't reported as never retrieved
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                reason = "timed out" if not done else "enough results"
+                await self._cancel_remote(session, request_id, reason)
+                release_slot()
+            if not done:
+                raise TimeoutError(f"Tool '{server_name}.{tool_name}' timed out after {timeout:.3g}s.")
+
+            text = json.dumps(partial[:stop_after], indent=2)
+            text += f"\n(Stopped early after {stop_after} results; more may exist.)"
+            return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
+        finally:
+            waiter.cancel()
+
+
+    @staticmethod
+    async def _cancel_remote(session: ClientSession, request_id, reason: str):
+        """Ask the server to stop working on an in-flight request; it then answers it with an error."""
+        from mcp import types
+
+        if request_id is None:
+            return
+        try:
+            await session.send_notification(types.ClientNotification(types.CancelledNotification(
+                params=types.CancelledNotificationParams(requestId=request_id, reason=reason),
+            )))
+        except Exception as e:
+            print(f"Could not cancel request {request_id}: {e}", file=sys.stderr)
     
 
-    async def process(self, query: str, event_handler: Callable[[dict], None] = None):
+    async def process(
+        self,
+        query: str,
+        event_handler: Callable[[dict], None] = None,
+        conversation_id: str | None = None,
+        plan: bool | None = None,
+    ):
         """
         Process a user query, allowing for sequential/chained tool execution.
+
+        Runs in the given conversation (the current one by default). Queries
+        for different conversations can run concurrently; queries for the
+        same conversation wait for each other. With plan (default: plan_mode
+        from server.json) the model plans all tool calls up front.
         """
+        conversation_id = conversation_id or self.conversation_id
+        lock = self.conversation_locks.setdefault(conversation_id, asyncio.Lock())
+        async with lock:
+            conv = self.store.get(conversation_id)
+            return await self._process(query, event_handler, conv, self.plan_mode if plan is None else plan)
+
+
+    async def _process(self, query: str, event_handler: Callable[[dict], None], conv: Conversation, plan: bool = False):
+        history = conv.messages
         # 1. Initialize Request & Eventing
         request_id = str(uuid.uuid4())
+        deadline = time.monotonic() + self.request_timeout
         self._emit(event_handler, "request_started", request_id, {"query": query})
 
         # 2. Handle Special Commands
         if query.strip().lower() in ["/clear", "/reset", "/wipe"]:
-            return self.clear_memory()
+            return self.clear_memory(conv)
         
         if query.strip().lower() in ["/summarize", "/sum"]:
-            return await self.summarize_memory()
+            return await self.summarize_memory(conv)
 
-        if len(self.history) > 30:
-            await self.summarize_memory()
+        if len(history) > 30:
+            await self.summarize_memory(conv)
 
         # 3. Update Memory
-        self.history.append({"role": "user", "content": query})
-        self.save_memory()
+        history.append({"role": "user", "content": query})
+        self.save_memory(conv)
 
         # 4. Planning & Gating
         self._emit(event_handler, "planning_started", request_id)
@@ -365,16 +698,43 @@ class MCPClient:
             "tools": [t["name"] for t in filtered_tools]
         })
 
-        # 5. Execution Loop
-        for step_idx in range(15):
+        guard = LoopGuard()
+
+        # 5. Plan-then-execute: one LLM call plans every tool call, they run as a DAG,
+        #    and the step loop below only has to produce the answer (or repair failures)
+        if plan:
+            reply = await self._plan_and_execute(
+                history, conv, filtered_tools, intent, event_handler, request_id, deadline, guard
+            )
+            if reply is not None:
+                # The model answered directly, no tools needed
+                history.append({"role": "assistant", "content": reply})
+                self.save_memory(conv)
+                self._emit(event_handler, "assistant_message", request_id, {
+                    "content": reply
+                })
+                self._emit(event_handler, "request_completed", request_id, {
+                    "result_length": len(reply),
+                    "stats": guard.stats(1, MAX_STEPS, False)
+                })
+                return reply
+
+        # 6. Execution Loop
+        for step_idx in range(MAX_STEPS):
+
+            if time.monotonic() >= deadline:
+                reason = f"Request deadline of {self.request_timeout}s exceeded"
+                self._emit(event_handler, "request_failed", request_id, {"reason": reason})
+                return f"Error: {reason}."
             
             self._emit(event_handler, "step_started", request_id, {
                 "step": step_idx + 1,
-                "max_steps": 15
+                "max_steps": MAX_STEPS
             })
 
             # Generate response using ONLY filtered tools
-            response = self.ai.generate(self.history, filtered_tools)
+            # (off the event loop, so other conversations keep going meanwhile)
+            response = await asyncio.to_thread(self.ai.generate, list(history), filtered_tools)
             
             if isinstance(response, dict):
                 reply = response["message"]["content"]
@@ -399,8 +759,8 @@ class MCPClient:
                             server_name, tool_name = full_name.split(".", 1)
                         else:
                             error_msg = f"Error: Tool '{full_name}' must include server prefix (e.g., 'server.tool')"
-                            self.history.append({"role": "assistant", "content": reply})
-                            self.history.append({"role": "system", "content": error_msg})
+                            history.append({"role": "assistant", "content": reply})
+                            history.append({"role": "system", "content": error_msg})
                             continue 
                         
                         # --- POLICY CHECK ---
@@ -413,9 +773,9 @@ class MCPClient:
                             })
                             
                             # Feedback to AI
-                            self.history.append({"role": "assistant", "content": reply})
-                            self.history.append({"role": "user", "content": f"SYSTEM: {block_msg}"})
-                            self.save_memory()
+                            history.append({"role": "assistant", "content": reply})
+                            history.append({"role": "user", "content": f"SYSTEM: {block_msg}"})
+                            self.save_memory(conv)
                             self._emit(event_handler, "assistant_message", request_id, {
                                 "content": block_msg
                             })
@@ -423,40 +783,55 @@ class MCPClient:
                             return block_msg
                         
 
-                        # Notify UI: Tool Starting
-                        self._emit(event_handler, "tool_call_started", request_id, {
-                            "tool": full_name,
-                            "args": args
-                        })
-
-                        print(f"   [Tool Call] {full_name} with args: {args}", file=sys.stderr)
-
-                        try:
-                            # Execute
-                            result = await self.call_tool(server_name, tool_name, args)
-                            
-                            # Notify UI: Success
-                            self._emit(event_handler, "tool_call_succeeded", request_id, {
-                                "tool": full_name
-                            })
-
-                            content_str = self.print_response(result)
-                            
-                        except Exception as tool_err:
-                            # Notify UI: Failure
-                            self._emit(event_handler, "tool_call_failed", request_id, {
+                        # Exact repeats are answered from the earlier observation
+                        earlier = guard.lookup(full_name, args)
+                        if earlier is not None:
+                            content_str, ok = earlier
+                            self._emit(event_handler, "tool_call_deduplicated", request_id, {
                                 "tool": full_name,
-                                "error": str(tool_err)
+                                "args": args
                             })
-                            content_str = f"Error executing tool: {str(tool_err)}"
-
-
-                        self.history.append({"role": "assistant", "content": reply})
-                        self.history.append({
+                            observation = (
+                                f"{content_str}\n\nNOTE: You already made this exact call in this request "
+                                "and this is its result. Do not repeat it; use the result or try something else."
+                            )
+                        else:
+                            content_str, ok = await self._run_tool(
+                                event_handler, request_id, server_name, tool_name, args, deadline
+                            )
+                            # A file read again shows up as a diff against what the model already saw
+                            observation = self.file_views(conv).observe(
+                                server_name, tool_name, args, content_str, conv.first_seq + len(history), ok
+                            )
+
+                        loop_reason = guard.record(full_name, args, content_str, ok)
+
+                        history.append({"role": "assistant", "content": reply})
+                        history.append({
                             "role": "user", 
-                            "content": f"OBSERVATION [Tool Output from {full_name}]:\n{content_str}"
+                            "content": f"OBSERVATION [Tool Output from {full_name}]:\n{observation}"
                         })
-                        self.save_memory()
+                        self.save_memory(conv)
+
+                        if loop_reason:
+                            diagnostic = (
+                                f"I stopped because I was going in circles: {loop_reason} "
+                                f"The last result was:\n{content_str}"
+                            )
+                            history.append({"role": "assistant", "content": diagnostic})
+                            self.save_memory(conv)
+                            self._emit(event_handler, "loop_detected", request_id, {
+                                "tool": full_name,
+                                "reason": loop_reason
+                            })
+                            self._emit(event_handler, "assistant_message", request_id, {
+                                "content": diagnostic
+                            })
+                            self._emit(event_handler, "request_completed", request_id, {
+                                "result_length": len(diagnostic),
+                                "stats": guard.stats(step_idx + 1, MAX_STEPS, True)
+                            })
+                            return diagnostic
                         continue
                     
                 except Exception as e:
@@ -477,13 +852,14 @@ class MCPClient:
             
             if not tool_found:
                 # No tool called, we are done
-                self.history.append({"role": "assistant", "content": reply})
-                self.save_memory()
+                history.append({"role": "assistant", "content": reply})
+                self.save_memory(conv)
                 self._emit(event_handler, "assistant_message", request_id, {
                     "content": reply
                 })
                 self._emit(event_handler, "request_completed", request_id, {
-                    "result_length": len(reply)
+                    "result_length": len(reply),
+                    "stats": guard.stats(step_idx + 1, MAX_STEPS, False)
                 })
                 return reply
 
@@ -492,6 +868,195 @@ class MCPClient:
         return "Error: Maximum task steps exceeded (stuck in loop)."
 
 
+    async def _plan_and_execute(
+        self,
+        history: list[dict],
+        conv: Conversation,
+        filtered_tools: list[dict],
+        intent: str,
+        event_handler,
+        request_id: str,
+        deadline: float,
+        guard: LoopGuard,
+    ) -> str | None:
+        """
+        Ask the model for a plan and run it. Returns the model's reply when it
+        answered without a plan; otherwise the plan and its results are added
+        to the history and None is returned.
+        """
+        prompt = history + [{"role": "system", "content": PLAN_PROMPT}]
+        response = await asyncio.to_thread(self.ai.generate, prompt, filtered_tools)
+        reply = response["message"]["content"] if isinstance(response, dict) else response.message.content
+
+        data = self.extract_first_json(reply)
+        if not isinstance(data, dict) or ("plan" not in data and "tool" not in data):
+            return reply
+
+        try:
+            if "tool" in data:
+                # A single tool call is a one-step plan
+                data = {"plan": [{"id": "s1", "tool": data["tool"], "args": data.get("args", {})}]}
+            steps = parse_plan(
+                data,
+                {t["name"] for t in filtered_tools},
+                lambda server_name: self.check_policy(server_name, intent),
+            )
+        except PlanError as e:
+            self._emit(event_handler, "plan_rejected", request_id, {"reason": str(e)})
+            history.append({"role": "assistant", "content": reply})
+            history.append({"role": "user", "content": f"SYSTEM: The plan was rejected: {e} Continue with one tool call at a time."})
+            self.save_memory(conv)
+            return None
+
+        self._emit(event_handler, "plan_created", request_id, {
+            "steps": [step.to_dict() for step in steps]
+        })
+        start = time.perf_counter()
+        results = await self._execute_plan(steps, event_handler, request_id, deadline, guard)
+        failed = [step_id for step_id, (status, _) in results.items() if status != "ok"]
+        self._emit(event_handler, "plan_completed", request_id, {
+            "step_count": len(steps),
+            "failed": failed,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+        })
+
+        views = self.file_views(conv)
+        seq = conv.first_seq + len(history)
+        sections = []
+        for step in steps:
+            status, output = results[step.id]
+            observation = views.observe(step.server_name, step.tool_name, step.args, output, seq, status == "ok")
+            sections.append(f"[{step.id}] {step.tool} ({status}):\n{observation}")
+        report = "\n\n".join(sections)
+        if failed:
+            report += f"\n\nSteps {', '.join(failed)} did not succeed. Fix them with one tool call at a time, then answer."
+        else:
+            report += "\n\nAll planned steps succeeded. Answer the user now, without calling tools."
+        history.append({"role": "assistant", "content": reply})
+        history.append({"role": "user", "content": f"OBSERVATION [Plan results]:\n{report}"})
+        self.save_memory(conv)
+        return None
+
+
+    async def _execute_plan(
+        self,
+        steps: list[PlanStep],
+        event_handler,
+        request_id: str,
+        deadline: float,
+        guard: LoopGuard,
+    ) -> dict[str, tuple[str, str]]:
+        """
+        Run plan steps as soon as their dependencies finish (the server
+        semaphores still cap concurrency). Returns {step id: (status, output)}
+        with status "ok", "error" or "skipped".
+        """
+        results: dict[str, tuple[str, str]] = {}
+        finished = {step.id: asyncio.Event() for step in steps}
+
+        async def run(step: PlanStep):
+            try:
+                for dep in step.depends_on:
+                    await finished[dep].wait()
+                failed = [dep for dep in step.depends_on if results[dep][0] != "ok"]
+                if failed:
+                    results[step.id] = ("skipped", f"Skipped because {', '.join(failed)} did not succeed.")
+                    self._emit(event_handler, "plan_step_skipped", request_id, {
+                        "tool": step.tool,
+                        "reason": results[step.id][1]
+                    })
+                    return
+
+                args = substitute(step.args, {dep: results[dep][1] for dep in step.depends_on})
+                earlier = guard.lookup(step.tool, args)
+                if earlier is not None:
+                    output, ok = earlier
+                else:
+                    output, ok = await self._run_tool(
+                        event_handler, request_id, step.server_name, step.tool_name, args, deadline
+                    )
+                guard.record(step.tool, args, output, ok)
+                results[step.id] = ("ok" if ok else "error", output)
+            except Exception as e:
+                results[step.id] = ("error", f"Error: {e}")
+            finally:
+                finished[step.id].set()
+
+        await asyncio.gather(*(run(step) for step in steps))
+        return results
+
+
+    async def _run_tool(
+        self,
+        event_handler,
+        request_id: str,
+        server_name: str,
+        tool_name: str,
+        args: dict,
+        deadline: float,
+    ) -> tuple[str, bool]:
+        """
+        Run one tool call with UI events. Returns (observation text, ok);
+        on failure the text is the error message.
+        """
+        full_name = f"{server_name}.{tool_name}"
+
+        # Notify UI: Tool Starting
+        self._emit(event_handler, "tool_call_started", request_id, {
+            "tool": full_name,
+            "args": args
+        })
+
+        print(f"   [Tool Call] {full_name} with args: {args}", file=sys.stderr)
+
+        def forward_progress(update: dict):
+            self._emit(event_handler, "tool_call_progress", request_id, {
+                "tool": full_name,
+                "progress": update["progress"],
+                "total": update["total"],
+                "message": update["message"],
+                "partial_count": len(update["partial"]),
+            })
+
+        try:
+            # Execute
+            result = await self.call_tool(
+                server_name, tool_name, args, deadline, on_progress=forward_progress
+            )
+            
+            content_str = self.print_response(result)
+            # Decided here, from the result, so file content that starts with "Error" is still a success
+            ok = not result.isError and (tool_name in RAW_TEXT_TOOLS or not content_str.startswith("Error"))
+
+            # Notify UI: Success
+            self._emit(event_handler, "tool_call_succeeded", request_id, {
+                "tool": full_name
+            })
+
+        except TimeoutError as timeout_err:
+            self._emit(event_handler, "tool_call_failed", request_id, {
+                "tool": full_name,
+                "error": str(timeout_err),
+                "timed_out": True
+            })
+            content_str = (
+                f"Error: {timeout_err} The tool produced no result. "
+                "Try narrower arguments or a different approach."
+            )
+            ok = False
+            
+        except Exception as tool_err:
+            # Notify UI: Failure
+            self._emit(event_handler, "tool_call_failed", request_id, {
+                "tool": full_name,
+                "error": str(tool_err)
+            })
+            content_str = f"Error executing tool: {str(tool_err)}"
+            ok = False
+
+        return content_str, ok
+
+
     async def get_all_tools(self):
         """Return cleaned tool definitions for Ollama."""
         tools = []
@@ -0,0 +1,92 @@
+import difflib
+import hashlib
+
+# Tools whose output is a file's full content, keyed by their path argument
+READ_TOOLS = {"read_file"}
+# Tools that write a file's full content from their arguments
+WRITE_TOOLS = {"write_file"}
+# Fall back to the full content when the diff would not be much smaller
+MAX_DIFF_RATIO = 0.6
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "replace"), digest_size=16).hexdigest()
+
+
+class FileViews:
+    """
+    The last version of each file the model has seen in one conversation.
+
+    When a file is read again, the observation becomes "unchanged" or a
+    unified diff against that version instead of the full content, so
+    edit/verify loops don't keep re-sending whole files. Each version
+    remembers the sequence number of the message that carries it, so it can
+    be forgotten once that message leaves the history window. Must be reset
+    whenever the history is summarized or cleared.
+    """
+
+    def __init__(self):
+        self.seen: dict[str, tuple[str, str, int]] = {}  # key -> (digest, content, message seq)
+        self.chars_saved = 0
+
+    @staticmethod
+    def _key(server_name: str, path: str) -> str:
+        path = path.replace("\\", "/").strip()
+        while path.startswith("./"):
+            path = path[2:]
+        return f"{server_name}:{path}"
+
+    def observe(
+        self, server_name: str, tool_name: str, args: dict, output: str, seq: int = 0, ok: bool = True
+    ) -> str:
+        """
+        Return the observation to put in history for a tool's output. seq is
+        the sequence number the next history message will get (a lower
+        bound for the message that carries this observation). ok is False
+        when the call failed, in which case output is an error message.
+        """
+        path = args.get("path")
+        if not ok or not isinstance(path, str):
+            return output
+        if args.get("if_changed_since") is not None and output.startswith("Not modified"):
+            return output  # read_file's short answer, not the file's content
+
+        if tool_name in WRITE_TOOLS and isinstance(args.get("content"), str):
+            # The model knows what it just wrote; a read right after is then "unchanged"
+            self.seen[self._key(server_name, path)] = (_digest(args["content"]), args["content"], seq)
+            return output
+        if tool_name not in READ_TOOLS:
+            return output
+
+        key = self._key(server_name, path)
+        digest = _digest(output)
+        previous = self.seen.get(key)
+        if previous is None:
+            self.seen[key] = (digest, output, seq)
+            return output
+
+        if previous[0] == digest:
+            observation = f"[File '{path}' is unchanged since you last saw it above.]"
+        else:
+            diff = "".join(difflib.unified_diff(
+                previous[1].splitlines(keepends=True),
+                output.splitlines(keepends=True),
+                fromfile=f"{path} (last seen)",
+                tofile=f"{path} (now)",
+            ))
+            if len(diff) > len(output) * MAX_DIFF_RATIO:
+                self.seen[key] = (digest, output, seq)
+                return output
+            observation = f"[File '{path}' changed since you last saw it above. Unified diff:]\n{diff}"
+            # The model only has this version as old content + diff, so it lasts as long as the old message
+            self.seen[key] = (digest, output, previous[2])
+
+        self.chars_saved += len(output) - len(observation)
+        return observation
+
+    def forget_before(self, first_seq: int):
+        """Drop versions carried by messages older than first_seq (no longer in the history)."""
+        self.seen = {k: v for k, v in self.seen.items() if v[2] >= first_seq}
+
+    def reset(self):
+        self.seen.clear()
@@ -0,0 +1,110 @@
+import re
+from typing import Callable
+
+# Longest plan accepted from the model
+MAX_PLAN_STEPS = 20
+
+PLAN_PROMPT = """
+PLANNING MODE: Do not call a tool yet. Reply with ONE JSON object that plans every tool call needed:
+{"plan": [{"id": "s1", "tool": "<server>.<tool>", "args": { ... }, "depends_on": []}, ...]}
+- Steps without dependencies run in parallel, so only list real dependencies in "depends_on".
+- To use the output of an earlier step inside args, write "{{<step id>}}" in a string, e.g. {"content": "{{s1}}"},
+  and list that step in "depends_on".
+- If the request needs no tools at all, answer normally instead of replying with a plan.
+"""
+
+_REF = re.compile(r"\{\{\s*([\w-]+)\s*\}\}")
+
+
+class PlanError(ValueError):
+    """Raised when a plan from the model cannot be executed."""
+
+
+class PlanStep:
+    def __init__(self, step_id: str, tool: str, args: dict, depends_on: list[str]):
+        self.id = step_id
+        self.tool = tool
+        self.server_name, self.tool_name = tool.split(".", 1)
+        self.args = args
+        self.depends_on = depends_on
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "tool": self.tool, "args": self.args, "depends_on": self.depends_on}
+
+
+def _references(value) -> set[str]:
+    if isinstance(value, str):
+        return set(_REF.findall(value))
+    if isinstance(value, dict):
+        return set().union(*(_references(v) for v in value.values())) if value else set()
+    if isinstance(value, list):
+        return set().union(*(_references(v) for v in value)) if value else set()
+    return set()
+
+
+def parse_plan(data: dict, allowed_tools: set[str], check_policy: Callable[[str], bool]) -> list[PlanStep]:
+    """
+    Validate a plan from the model and return its steps in dependency order.
+    Raises PlanError with a reason the model can act on.
+    """
+    raw_steps = data.get("plan")
+    if not isinstance(raw_steps, list) or not raw_steps:
+        raise PlanError("'plan' must be a non-empty list of steps.")
+    if len(raw_steps) > MAX_PLAN_STEPS:
+        raise PlanError(f"Plans are limited to {MAX_PLAN_STEPS} steps.")
+
+    steps: dict[str, PlanStep] = {}
+    for index, raw in enumerate(raw_steps, 1):
+        if not isinstance(raw, dict):
+            raise PlanError(f"Step {index} is not an object.")
+        step_id = str(raw.get("id") or f"s{index}")
+        tool = raw.get("tool", "")
+        args = raw.get("args") or {}
+        depends_on = [str(d) for d in raw.get("depends_on") or []]
+
+        if step_id in steps:
+            raise PlanError(f"Duplicate step id '{step_id}'.")
+        if "." not in tool:
+            raise PlanError(f"Step '{step_id}': tool '{tool}' must include server prefix (e.g., 'server.tool').")
+        if tool not in allowed_tools:
+            raise PlanError(f"Step '{step_id}': unknown or unavailable tool '{tool}'.")
+        if not check_policy(tool.split(".", 1)[0]):
+            raise PlanError(f"Step '{step_id}': tool '{tool}' is not allowed for this request.")
+        if not isinstance(args, dict):
+            raise PlanError(f"Step '{step_id}': args must be an object.")
+
+        # A reference to another step's output is an implicit dependency
+        for ref in sorted(_references(args)):
+            if ref not in depends_on:
+                depends_on.append(ref)
+        steps[step_id] = PlanStep(step_id, tool, args, depends_on)
+
+    for step in steps.values():
+        for dep in step.depends_on:
+            if dep not in steps:
+                raise PlanError(f"Step '{step.id}' depends on unknown step '{dep}'.")
+
+    # Kahn's algorithm: dependency order, and proof there is no cycle
+    ordered = []
+    remaining = {s.id: set(s.depends_on) for s in steps.values()}
+    while remaining:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise PlanError(f"Steps {sorted(remaining)} depend on each other in a cycle.")
+        for step_id in ready:
+            ordered.append(steps[step_id])
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return ordered
+
+
+def substitute(value, outputs: dict[str, str]):
+    """Replace {{step}} references in args with the outputs of those steps."""
+    if isinstance(value, str):
+        return _REF.sub(lambda m: outputs.get(m.group(1), m.group(0)), value)
+    if isinstance(value, dict):
+        return {k: substitute(v, outputs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [substitute(v, outputs) for v in value]
+    return value
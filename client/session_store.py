@@ -0,0 +1,181 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+# Messages kept in memory per conversation; older ones stay on disk only
+RECENT_WINDOW = 50
+# Conversations kept in memory at once
+MAX_ACTIVE = 8
+
+
+class Conversation:
+    """The in-memory recent window of one conversation."""
+
+    def __init__(self, conversation_id: str, messages: list[dict], next_seq: int):
+        self.id = conversation_id
+        self.messages = messages
+        self.next_seq = next_seq
+        self.saved = len(messages)  # messages[:saved] are already on disk
+
+    @property
+    def first_seq(self) -> int:
+        """Sequence number of messages[0]; messages after it are numbered consecutively."""
+        return self.next_seq - self.saved
+
+
+class SessionStore:
+    """
+    Conversations and their messages in SQLite (WAL), indexed by
+    (conversation_id, seq). Only the last RECENT_WINDOW messages of a
+    conversation are loaded, and at most MAX_ACTIVE conversations are kept
+    in memory (least recently used ones are dropped and reloaded on demand).
+    """
+
+    def __init__(self, path: Path, window: int = RECENT_WINDOW, max_active: int = MAX_ACTIVE):
+        self.window = window
+        self.max_active = max_active
+        self.active: OrderedDict[str, Conversation] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS conversations_updated ON conversations(updated_at);
+            CREATE TABLE IF NOT EXISTS messages (
+                conversation_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                extra TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (conversation_id, seq)
+            ) WITHOUT ROWID;
+        """)
+        self._db.commit()
+
+    def create(self, title: str = "New conversation") -> str:
+        conversation_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO conversations VALUES (?, ?, ?, ?)",
+                (conversation_id, title, now, now),
+            )
+            self._db.commit()
+        self._remember(Conversation(conversation_id, [], 0))
+        return conversation_id
+
+    def exists(self, conversation_id: str) -> bool:
+        if conversation_id in self.active:
+            return True
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+        return row is not None
+
+    def latest(self) -> str | None:
+        """Id of the most recently updated conversation, if any."""
+        with self._lock:
+            row = self._db.execute("SELECT id FROM conversations ORDER BY updated_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def list_conversations(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute("""
+                SELECT c.id, c.title, c.created_at, c.updated_at,
+                       (SELECT COUNT(*) FROM messages m WHERE m.conversation_id = c.id)
+                FROM conversations c ORDER BY c.updated_at DESC LIMIT ?
+            """, (limit,)).fetchall()
+        return [
+            {"id": r[0], "title": r[1], "created_at": r[2], "updated_at": r[3], "message_count": r[4]}
+            for r in rows
+        ]
+
+    def get(self, conversation_id: str) -> Conversation:
+        """The conversation's recent window, loading it if needed. Raises KeyError if unknown."""
+        conv = self.active.get(conversation_id)
+        if conv is not None:
+            self.active.move_to_end(conversation_id)
+            return conv
+
+        if not self.exists(conversation_id):
+            raise KeyError(f"Unknown conversation '{conversation_id}'.")
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, role, content, extra FROM messages WHERE conversation_id = ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (conversation_id, self.window),
+            ).fetchall()
+        rows.reverse()
+        messages = [_decode(role, content, extra) for _, role, content, extra in rows]
+        next_seq = rows[-1][0] + 1 if rows else 0
+        conv = Conversation(conversation_id, messages, next_seq)
+        self._remember(conv)
+        return conv
+
+    def save(self, conv: Conversation):
+        """Write the messages appended since the last save."""
+        new = conv.messages[conv.saved:]
+        if not new:
+            return
+        now = time.time()
+        rows = [
+            (conv.id, conv.next_seq + i, *_encode(message), now)
+            for i, message in enumerate(new)
+        ]
+        with self._lock:
+            self._db.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute("UPDATE conversations SET updated_at = ? WHERE id = ?", (now, conv.id))
+            self._db.commit()
+        conv.next_seq += len(new)
+        conv.saved = len(conv.messages)
+        self._trim(conv)
+
+    def replace(self, conv: Conversation, messages: list[dict]):
+        """Replace the whole stored conversation (used by clear and summarize), atomically."""
+        now = time.time()
+        rows = [(conv.id, seq, *_encode(message), now) for seq, message in enumerate(messages)]
+        with self._lock:
+            # One transaction: a crash part-way leaves the old messages, never none
+            with self._db:
+                self._db.execute("DELETE FROM messages WHERE conversation_id = ?", (conv.id,))
+                self._db.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._db.execute("UPDATE conversations SET updated_at = ? WHERE id = ?", (now, conv.id))
+        conv.messages[:] = messages
+        conv.next_seq = len(messages)
+        conv.saved = len(messages)
+        self._trim(conv)
+
+    def _remember(self, conv: Conversation):
+        self.active[conv.id] = conv
+        self.active.move_to_end(conv.id)
+        while len(self.active) > self.max_active:
+            self.active.popitem(last=False)
+
+    def _trim(self, conv: Conversation):
+        # Drop saved messages that fell out of the window; they stay on disk
+        excess = len(conv.messages) - self.window
+        if excess > 0:
+            del conv.messages[:excess]
+            conv.saved -= excess
+
+
+def _encode(message: dict) -> tuple:
+    extra = {k: v for k, v in message.items() if k not in ("role", "content")}
+    return message.get("role", "user"), message.get("content", ""), json.dumps(extra) if extra else None
+
+
+def _decode(role: str, content: str, extra: str | None) -> dict:
+    message = {"role": role, "content": content}
+    if extra:
+        message.update(json.loads(extra))
+    return message
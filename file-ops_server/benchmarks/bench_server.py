@@ -0,0 +1,305 @@
+"""
+Throughput and latency benchmark for the file-ops server over real MCP stdio.
+
+    python benchmarks/bench_server.py --files 1000,100000 --clients 8
+
+For each tree size, builds (or reuses) a synthetic sandbox of nested
+directories and files of varied sizes, starts main.py on it, and drives
+list_directory, read_file, write_file, file_info and search_files from
+--clients concurrent callers. Reports per-tool latency percentiles,
+throughput, errors and the server's memory, and writes everything to a
+JSON report so runs can be compared.
+
+Trees are kept under --tree-dir and reused by later runs with the same
+size and seed; delete that directory to reclaim the space.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+MAIN = SERVER_DIR / "main.py"
+
+TOOLS = ("list_directory", "read_file", "write_file", "file_info", "search_files")
+# Words used in file names, so search queries hit about 1/len(WORDS) of the tree
+WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+         "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa")
+# (weight, min bytes, max bytes): mostly small files, some medium, a few large.
+# Averages about 6 KB per file, so a 1M file tree takes about 6 GB of disk.
+SIZE_MIX = ((0.85, 64, 2 * 1024), (0.14, 2 * 1024, 32 * 1024), (0.01, 32 * 1024, 512 * 1024))
+ENTRIES_PER_DIR = 64
+
+
+def pick_size(rng: random.Random) -> int:
+    roll = rng.random()
+    for weight, low, high in SIZE_MIX:
+        if roll < weight:
+            return rng.randint(low, high)
+        roll -= weight
+    return SIZE_MIX[-1][2]
+
+
+def build_tree(root: Path, files: int, seed: int) -> dict:
+    """
+    Create `files` files spread over nested directories (ENTRIES_PER_DIR per
+    level) and write a manifest. An existing complete tree is reused.
+    """
+    manifest = root / ".manifest.json"
+    if manifest.exists():
+        return json.loads(manifest.read_text(encoding="utf-8"))
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    # One block of text that file contents are sliced from
+    chunk = "".join(rng.choices(WORDS, k=SIZE_MIX[-1][2] // 4)).encode("ascii")
+    chunk += b"\n" * (SIZE_MIX[-1][2] + 1 - len(chunk))
+    paths, dirs, total = [], set(), 0
+    for i in range(files):
+        # Directory path from the file index: 64 files per leaf, 64 subdirs per level
+        parts, n = [], i // ENTRIES_PER_DIR
+        while n:
+            parts.append(f"d{n % ENTRIES_PER_DIR:02d}")
+            n //= ENTRIES_PER_DIR
+        rel_dir = "/".join(reversed(parts)) or "."
+        name = f"f{i:07d}_{rng.choice(WORDS)}.txt"
+        rel = name if rel_dir == "." else f"{rel_dir}/{name}"
+
+        if rel_dir not in dirs:
+            (root / rel_dir).mkdir(parents=True, exist_ok=True)
+            dirs.add(rel_dir)
+        size = pick_size(rng)
+        offset = rng.randrange(len(chunk) - size) if size < len(chunk) else 0
+        with open(root / rel, "wb") as f:
+            f.write(chunk[offset:offset + size])
+        paths.append(rel)
+        total += size
+
+    info = {
+        "files": files,
+        "dirs": sorted(dirs),
+        "paths": paths,
+        "bytes": total,
+        "build_s": round(time.perf_counter() - start, 2),
+    }
+    manifest.write_text(json.dumps(info), encoding="utf-8")
+    return info
+
+
+def _descendants(pid: int) -> list[int]:
+    """Child process ids on Linux, via /proc."""
+    children = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        if ppid == pid:
+            children.append(int(entry.name))
+    return children + [d for c in children for d in _descendants(c)]
+
+
+def server_memory() -> dict | None:
+    """Current and peak RSS in MB of the server processes started by this script."""
+    try:
+        import psutil
+        procs = psutil.Process().children(recursive=True)
+        rss = sum(p.memory_info().rss for p in procs)
+        return {"rss_mb": round(rss / 2**20, 1), "peak_mb": None}
+    except ImportError:
+        pass
+    if not Path("/proc").is_dir():
+        return None
+    rss = peak = 0
+    for pid in _descendants(os.getpid()):
+        try:
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    rss += int(line.split()[1])
+                elif line.startswith("VmHWM:"):
+                    peak += int(line.split()[1])
+        except OSError:
+            continue
+    return {"rss_mb": round(rss / 1024, 1), "peak_mb": round(peak / 1024, 1)}
+
+
+def make_args(tool: str, tree: dict, rng: random.Random, worker: int, i: int) -> dict:
+    if tool == "list_directory":
+        return {"path": rng.choice(tree["dirs"])}
+    if tool == "read_file":
+        return {"path": rng.choice(tree["paths"])}
+    if tool == "file_info":
+        return {"path": rng.choice(tree["paths"])}
+    if tool == "write_file":
+        return {"path": f"bench-writes/w{worker}/{i % 100}.txt", "content": "x" * rng.randint(64, 8192)}
+    if tool == "search_files":
+        return {"query": rng.choice(WORDS), "max_results": 1000}
+    raise ValueError(f"Unknown tool {tool}")
+
+
+def summarize(latencies: list[float], errors: int, wall: float) -> dict:
+    if not latencies:
+        return {"calls": 0, "errors": errors}
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2)
+
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(latencies) / wall, 1) if wall else None,
+        "mean_ms": round(statistics.fmean(ordered), 2),
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+async def run_tool(session: ClientSession, tool: str, tree: dict, calls: int, clients: int, seed: int) -> dict:
+    latencies, errors = [], 0
+    remaining = calls
+
+    async def worker(n: int):
+        nonlocal remaining, errors
+        rng = random.Random(seed * 1000 + n)
+        i = 0
+        while remaining > 0:
+            remaining -= 1
+            args = make_args(tool, tree, rng, n, i)
+            i += 1
+            start = time.perf_counter()
+            try:
+                result = await session.call_tool(tool, args)
+                text = result.content[0].text if result.content else ""
+                if result.isError or text.startswith("Error"):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(clients)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def bench_tree(tree_dir: Path, tree: dict, args) -> dict:
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=[str(MAIN)],
+        env={**os.environ, "FILEOPS_SANDBOX_DIR": str(tree_dir)},
+        cwd=str(SERVER_DIR),
+    )
+    result = {"tools": {}, "memory": {}}
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            start = time.perf_counter()
+            await session.initialize()
+            result["startup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            result["memory"]["idle"] = server_memory()
+
+            for tool in args.tools:
+                calls = args.search_requests if tool == "search_files" else args.requests
+                print(f"  {tool:<15} {calls} calls x {args.clients} clients ...", file=sys.stderr)
+                result["tools"][tool] = await run_tool(session, tool, tree, calls, args.clients, args.seed)
+                result["memory"][f"after_{tool}"] = server_memory()
+
+            stats = await session.call_tool("server_stats", {})
+            try:
+                result["server_stats"] = json.loads(stats.content[0].text)
+            except (ValueError, IndexError, AttributeError):
+                result["server_stats"] = None
+    return result
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(run: dict):
+    print(f"\n{run['files']:,} files ({run['tree_bytes'] / 2**20:.0f} MB), startup {run['startup_ms']} ms")
+    print(f"{'tool':<16}{'calls':>7}{'err':>5}{'ops/s':>10}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for tool, s in run["tools"].items():
+        if not s.get("calls"):
+            continue
+        print(f"{tool:<16}{s['calls']:>7}{s['errors']:>5}{s['throughput_per_s']:>10}"
+              f"{s['p50_ms']:>9}{s['p90_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}")
+    memory = run["memory"].get(f"after_{list(run['tools'])[-1]}") if run["tools"] else None
+    if memory:
+        print(f"server memory: {memory['rss_mb']} MB RSS, peak {memory['peak_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", default="1000,10000", help="comma-separated tree sizes (up to 1000000)")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent callers")
+    parser.add_argument("--requests", type=int, default=500, help="calls per tool")
+    parser.add_argument("--search-requests", type=int, default=10, help="calls for search_files (walks the whole tree)")
+    parser.add_argument("--tools", default=",".join(TOOLS), help="comma-separated tools to run")
+    parser.add_argument("--tree-dir", type=Path, default=Path(tempfile.gettempdir()) / "fileops-bench",
+                        help="where synthetic trees are built and kept for reuse")
+    parser.add_argument("--output", type=Path, help="JSON report path (default: bench-results/<timestamp>.json)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    args.tools = [t for t in args.tools.split(",") if t]
+    unknown = set(args.tools) - set(TOOLS)
+    if unknown:
+        parser.error(f"unknown tools: {', '.join(sorted(unknown))}")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "clients": args.clients,
+            "requests": args.requests,
+            "search_requests": args.search_requests,
+            "seed": args.seed,
+            "max_threads": os.environ.get("FILEOPS_MAX_THREADS"),
+        },
+        "runs": [],
+    }
+
+    for files in (int(n) for n in args.files.split(",")):
+        tree_dir = args.tree_dir / f"{files}-seed{args.seed}"
+        tree_dir.mkdir(parents=True, exist_ok=True)
+        print(f"Preparing {files:,} files in {tree_dir} ...", file=sys.stderr)
+        tree = build_tree(tree_dir, files, args.seed)
+
+        run = asyncio.run(bench_tree(tree_dir, tree, args))
+        run = {"files": files, "dirs": len(tree["dirs"]), "tree_bytes": tree["bytes"], "build_s": tree["build_s"], **run}
+        report["runs"].append(run)
+        print_summary(run)
+
+    output = args.output or SERVER_DIR / "bench-results" / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nReport written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,12 @@
 from mcp.server.fastmcp import FastMCP
 from pathlib import Path
+import argparse
+import os
 
 from tools.file_ops import register_file_tools
+from mcp_common.stats import instrument
 
-SANDBOX_DIR = Path(__file__).parent / "sandbox"
+SANDBOX_DIR = Path(os.environ.get("FILEOPS_SANDBOX_DIR", Path(__file__).parent / "sandbox"))
 SANDBOX_DIR = SANDBOX_DIR.resolve()
 SANDBOX_DIR.mkdir(parents=True, exist_ok=True)
 # Ensure the sandbox directory exists for experimenting with file operations in current directory 
@@ -11,8 +14,19 @@ SANDBOX_DIR.mkdir(parents=True, exist_ok=True)
 mcp = FastMCP("File-Operations")
 
 def main():
+    parser = argparse.ArgumentParser(description="File operations MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio",
+                        help="stdio (default) for a private child process, streamable-http/sse to share one server")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address for HTTP transports")
+    parser.add_argument("--port", type=int, default=8765, help="port for HTTP transports")
+    args = parser.parse_args()
+
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+
+    instrument(mcp)
     register_file_tools(mcp, SANDBOX_DIR)
-    mcp.run(transport="stdio")
+    mcp.run(transport=args.transport)
 
 if __name__ == "__main__":
     main()  
\ No newline at end of file
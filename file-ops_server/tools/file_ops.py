@@ -1,70 +1,182 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
+from collections import Counter
 from pathlib import Path
+import os
+import threading
+import time
 from utils.paths import safe_join
+from utils.offload import run_blocking, ProgressReporter
+from utils.hashing import content_hash
+from utils.copy import copy_file as _copy_file
 
 SANDBOX = None
+INDEX = None  # SemanticIndex, created by the first semantic_search (or at startup)
+_INDEX_LOCK = threading.Lock()
+
+# delete_tree refuses trees bigger than this, however it is asked
+DELETE_TREE_MAX_ENTRIES = int(os.environ.get("FILEOPS_DELETE_MAX_ENTRIES", "100000"))
+# Build the semantic index when the server starts instead of on the first semantic_search
+INDEX_ON_START = os.environ.get("FILEOPS_INDEX_ON_START", "0") == "1"
+# How long semantic_search waits for the first build before asking to retry
+INDEX_WAIT = 45.0
+
+
+def _get_index():
+    global INDEX
+    if INDEX is None:
+        # Called from worker threads; two racing calls would each load the index
+        with _INDEX_LOCK:
+            if INDEX is None:
+                # numpy is only needed once semantic search is used
+                from utils.semantic import SemanticIndex
+                INDEX = SemanticIndex(SANDBOX)
+    return INDEX
+
+
+def _notify_index(*paths: Path):
+    """Tell the semantic index (if there is one yet) that these paths changed."""
+    if INDEX is not None:
+        INDEX.notify(*paths)
+
+
+def _is_empty_dir(target: Path) -> bool:
+    with os.scandir(target) as entries:
+        return next(entries, None) is None
+
+
+def _describe(target: Path, path: str, include_hash: bool = False) -> dict:
+    """Build the file_info dict for an already sandbox-checked path."""
+    if not target.exists():
+        return {"error":f"'{path}' does not exist. "}
+
+    try:
+        stat = target.stat()
+        is_dir = target.is_dir()
+        info = {
+            "name" : target.name,
+            "path" : path,
+            "absolute_path": str(target),
+            "type" : "directory" if is_dir else "file",
+
+            "size_bytes" : None if is_dir else stat.st_size,
+
+            "created_at" : stat.st_ctime,
+            "modified_at" : stat.st_mtime,
+            "accessed_at" : stat.st_atime,
+
+            "is_empty_directory": is_dir and _is_empty_dir(target),
+        }
+
+        if include_hash and not is_dir:
+            info["content_hash"] = content_hash(target, stat)
+
+        return info
+
+    except Exception as e:
+        return {"error": f"Error retrieving file info: {str(e)}"}
+
+
+def _format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def _skipped_note(skipped: list[str]) -> str:
+    if not skipped:
+        return ""
+    shown = "; ".join(skipped[:10])
+    more = f" (and {len(skipped) - 10} more)" if len(skipped) > 10 else ""
+    return f" Skipped {len(skipped)}: {shown}{more}."
+
 
 def register_file_tools(mcp: FastMCP, sandbox_root: Path):
 
     global SANDBOX
     SANDBOX = sandbox_root
+    if INDEX_ON_START:
+        _get_index().build_in_background()
     # register module-level tools with the provided mcp instance
     
 
     @mcp.tool() # List Directory Tool
     async def list_directory(path: str) -> list[str]:
         """List files and directories in the given path within the sandbox."""
+        def _work():
+            target = safe_join(SANDBOX, path)
+            if not target.exists():
+                raise FileNotFoundError(f"Path '{path}' does not exist.")
+            if not target.is_dir():
+                raise NotADirectoryError(f"Path '{path}' is not a directory.")
         
-        target = safe_join(SANDBOX, path)
-        if not target.exists():
-            raise FileNotFoundError(f"Path '{path}' does not exist.")
-        if not target.is_dir():
-            raise NotADirectoryError(f"Path '{path}' is not a directory.")
-        
-        items = []
-        for entry in target.iterdir():
-            if entry.is_dir():
-                items.append(entry.name+'/')
+            items = []
+            for entry in target.iterdir():
+                if entry.is_dir():
+                    items.append(entry.name+'/')
                 
-            else:
-                items.append(entry.name)
-        return items
-    
+                else:
+                    items.append(entry.name)
+            return items
+
+        return await run_blocking("list_directory", _work)
+
     @mcp.tool() # Read File Tool
-    async def read_file(path: str) -> str:
+    async def read_file(path: str, if_changed_since: str | float | None = None) -> str:
         """
         Read the contents of a file at the given path within the sandbox.
+
+        Args:
+            path: Relative file path to read.
+            if_changed_since: Optional content_hash or modified_at value from a
+                previous file_info call. If the file still matches it, a short
+                "not modified" message is returned instead of the content.
         """
-        target = safe_join(SANDBOX, path)
-        if not target.exists():
-            raise FileNotFoundError(f"File '{path}' does not exist.")
-        if not target.is_file():
-            raise IsADirectoryError(f"Path '{path}' is not a file.")
-        
-        try:
-            return target.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
-            return "Error: File is not a UTF-8 text file."
-        except Exception as e:
-            return f"Error reading file: {str(e)}"
+        def _work():
+            target = safe_join(SANDBOX, path)
+            if not target.exists():
+                raise FileNotFoundError(f"File '{path}' does not exist.")
+            if not target.is_file():
+                raise IsADirectoryError(f"Path '{path}' is not a file.")
+
+            if if_changed_since is not None:
+                stat = target.stat()
+                if isinstance(if_changed_since, str):
+                    unchanged = content_hash(target, stat) == if_changed_since
+                else:
+                    unchanged = stat.st_mtime <= if_changed_since
+                if unchanged:
+                    return f"Not modified: '{path}' has not changed since it was last read."
         
+            # Raised, not returned: the content of a file can itself start with "Error"
+            try:
+                return target.read_text(encoding="utf-8")
+            except UnicodeDecodeError:
+                raise ValueError(f"File '{path}' is not a UTF-8 text file.")
+
+        return await run_blocking("read_file", _work)
+
     @mcp.tool() # Write File Tool
     async def write_file(path: str, content: str) -> str:
         """
         Write content to a file at the given path within the sandbox.
         Creates the file if it does not exist.
         """
-        target = safe_join(SANDBOX, path)
-        if target.exists() and target.is_dir():
-            raise IsADirectoryError(f"Path '{path}' is a directory.")
-        
-        try:
-            target.parent.mkdir(parents=True, exist_ok=True)
-            target.write_text(content, encoding="utf-8")
-            return f"Successfully wrote to file '{path}'."
-        except Exception as e:
-            return f"Error writing to file: {str(e)}"
+        def _work():
+            target = safe_join(SANDBOX, path)
+            if target.exists() and target.is_dir():
+                raise IsADirectoryError(f"Path '{path}' is a directory.")
         
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_text(content, encoding="utf-8")
+                _notify_index(target)
+                return f"Successfully wrote to file '{path}'."
+            except Exception as e:
+                return f"Error writing to file: {str(e)}"
+
+        return await run_blocking("write_file", _work)
+
     @mcp.tool() # Create File Tool
     async def create_file(path: str) -> str:
         """
@@ -73,17 +185,21 @@ def register_file_tools(mcp: FastMCP, sandbox_root: Path):
         Args:
             path: Relative file path to create.
         """
-        target = safe_join(SANDBOX, path)
-        if target.exists() and target.is_file():
-            raise FileExistsError(f"File '{path}' already exists.")
-        
-        try:
-            target.parent.mkdir(parents=True, exist_ok=True)
-            target.touch()
-            return f"Successfully created file '{path}'."
-        except Exception as e:
-            return f"Error creating file: {str(e)}"
+        def _work():
+            target = safe_join(SANDBOX, path)
+            if target.exists() and target.is_file():
+                raise FileExistsError(f"File '{path}' already exists.")
         
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.touch()
+                _notify_index(target)
+                return f"Successfully created file '{path}'."
+            except Exception as e:
+                return f"Error creating file: {str(e)}"
+
+        return await run_blocking("create_file", _work)
+
     @mcp.tool() # Delete File Tool
     async def delete_file(path: str) -> str:
         """
@@ -92,25 +208,30 @@ def register_file_tools(mcp: FastMCP, sandbox_root: Path):
         Args:
             path: Path of the file or directory to delete.
         """
-        target = safe_join(SANDBOX, path)
-        if not target.exists():
-            return f"Error: '{path}' does not exist."
+        def _work():
+            target = safe_join(SANDBOX, path)
+            if not target.exists():
+                return f"Error: '{path}' does not exist."
+        
+            if target.is_dir():
+                try:
+                    target.rmdir()   # rmdir only deletes EMPTY dirs
+                    _notify_index(target)
+                    return f"Directory deleted: {path}"
+                except OSError:
+                    return f"Error: Directory '{path}' is not empty. Use delete_tree to delete it with its contents."
+                except Exception as e:
+                    return f"Error deleting directory: {str(e)}"
         
-        if target.is_dir():
             try:
-                target.rmdir()   # rmdir only deletes EMPTY dirs
-                return f"Directory deleted: {path}"
-            except OSError:
-                return f"Error: Directory '{path}' is not empty."
+                target.unlink()
+                _notify_index(target)
+                return f"File deleted: {path}"
             except Exception as e:
-                return f"Error deleting directory: {str(e)}"
-        
-        try:
-            target.unlink()
-            return f"File deleted: {path}"
-        except Exception as e:
-            return f"Error deleting file: {str(e)}"
-        
+                return f"Error deleting file: {str(e)}"
+
+        return await run_blocking("delete_file", _work)
+
     @mcp.tool() # Rename File Tool
     async def rename_file(old_path:str , new_path:str) ->str:
         """
@@ -120,25 +241,29 @@ def register_file_tools(mcp: FastMCP, sandbox_root: Path):
             old_path: Current path of the file or directory.
             new_path: New desired path.
         """
-        old_path_target = safe_join(SANDBOX, old_path)
-        new_path_target = safe_join(SANDBOX, new_path)
+        def _work():
+            old_path_target = safe_join(SANDBOX, old_path)
+            new_path_target = safe_join(SANDBOX, new_path)
 
-        if not old_path_target.exists():
-            return f"Error: '{old_path}' does not exist."
-        if new_path_target.exists() and new_path_target.is_dir():
-            return f"Error: Cannot overwrite an existing directory: {new_path}"
-        
-        try:
-            new_path_target.parent.mkdir(parents=True, exist_ok=True)
-        except Exception as e:
-            return f"Error creating parent directories: {str(e)}"
+            if not old_path_target.exists():
+                return f"Error: '{old_path}' does not exist."
+            if new_path_target.exists() and new_path_target.is_dir():
+                return f"Error: Cannot overwrite an existing directory: {new_path}"
         
-        try :
-            old_path_target.rename(new_path_target)
-            return f"Successfully renamed '{old_path}' to '{new_path}'."
-        except Exception as e:
-            return f"Error renaming file or directory: {str(e)}"
+            try:
+                new_path_target.parent.mkdir(parents=True, exist_ok=True)
+            except Exception as e:
+                return f"Error creating parent directories: {str(e)}"
         
+            try :
+                old_path_target.rename(new_path_target)
+                _notify_index(old_path_target, new_path_target)
+                return f"Successfully renamed '{old_path}' to '{new_path}'."
+            except Exception as e:
+                return f"Error renaming file or directory: {str(e)}"
+
+        return await run_blocking("rename_file", _work)
+
     @mcp.tool() # Move Tool
     async def move_file(source_path: str, dest_path: str) -> str:
         """
@@ -147,100 +272,367 @@ def register_file_tools(mcp: FastMCP, sandbox_root: Path):
         - If dest_path is an existing directory (or ends with '/'), moves source into it.
         - Otherwise, moves/renames source to dest_path.
         """
-        source = safe_join(SANDBOX, source_path)
-        dest = safe_join(SANDBOX, dest_path)
+        def _work():
+            source = safe_join(SANDBOX, source_path)
+            dest = safe_join(SANDBOX, dest_path)
 
-        if not source.exists():
-            return f"Error: Source '{source_path}' does not exist."
+            if not source.exists():
+                return f"Error: Source '{source_path}' does not exist."
 
-        # Determine if the user intends to move INTO a directory
-        # 1. It ends with a slash (explicit directory intention)
-        # 2. It matches an existing directory
-        is_directory_move = dest_path.endswith('/') or dest_path.endswith('\\') or (dest.exists() and dest.is_dir())
+            # Determine if the user intends to move INTO a directory
+            # 1. It ends with a slash (explicit directory intention)
+            # 2. It matches an existing directory
+            is_directory_move = dest_path.endswith('/') or dest_path.endswith('\\') or (dest.exists() and dest.is_dir())
 
-        if is_directory_move:
-            # Move INTO the directory
-            try:
-                dest.mkdir(parents=True, exist_ok=True)
-                target = dest / source.name
+            if is_directory_move:
+                # Move INTO the directory
+                try:
+                    dest.mkdir(parents=True, exist_ok=True)
+                    target = dest / source.name
                 
-                if target.exists():
-                    return f"Error: '{target.name}' already exists in '{dest_path}'."
+                    if target.exists():
+                        return f"Error: '{target.name}' already exists in '{dest_path}'."
                 
-                source.rename(target)
-                return f"Successfully moved '{source_path}' into '{dest_path}'."
-            except Exception as e:
-                return f"Error moving file: {str(e)}"
+                    source.rename(target)
+                    _notify_index(source, target)
+                    return f"Successfully moved '{source_path}' into '{dest_path}'."
+                except Exception as e:
+                    return f"Error moving file: {str(e)}"
         
-        else:
-            # Move TO the specific path (Rename)
-            if dest.exists():
-                return f"Error: Destination '{dest_path}' already exists."
+            else:
+                # Move TO the specific path (Rename)
+                if dest.exists():
+                    return f"Error: Destination '{dest_path}' already exists."
             
+                try:
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    source.rename(dest)
+                    _notify_index(source, dest)
+                    return f"Successfully moved/renamed '{source_path}' to '{dest_path}'."
+                except Exception as e:
+                    return f"Error moving file: {str(e)}"
+
+        return await run_blocking("move_file", _work)
+
+    @mcp.tool() # Copy File Tool
+    async def copy_file(source_path: str, dest_path: str, overwrite: bool = False) -> str:
+        """
+        Copy a file within the sandbox without reading it into the conversation.
+        Much faster than read_file + write_file, and works for binary files.
+
+        - If dest_path is an existing directory (or ends with '/'), copies source into it.
+
+        Args:
+            source_path: File to copy.
+            dest_path: Destination file path or directory.
+            overwrite: Replace the destination file if it exists.
+        """
+        def _work():
+            source = safe_join(SANDBOX, source_path)
+            dest = safe_join(SANDBOX, dest_path)
+
+            if not source.is_file():
+                return f"Error: Source '{source_path}' is not a file."
+            if dest_path.endswith(('/', '\\')) or dest.is_dir():
+                dest.mkdir(parents=True, exist_ok=True)
+                dest = dest / source.name
+            if dest == source:
+                return "Error: Source and destination are the same file."
+            if dest.exists() and not overwrite:
+                return f"Error: Destination '{dest.relative_to(SANDBOX)}' already exists (pass overwrite=true to replace it)."
+
             try:
                 dest.parent.mkdir(parents=True, exist_ok=True)
-                source.rename(dest)
-                return f"Successfully moved/renamed '{source_path}' to '{dest_path}'."
+                size, method = _copy_file(source, dest)
+                _notify_index(dest)
+                return f"Copied '{source_path}' to '{dest.relative_to(SANDBOX)}' ({_format_bytes(size)}, {method})."
             except Exception as e:
-                return f"Error moving file: {str(e)}"
+                return f"Error copying file: {str(e)}"
+
+        return await run_blocking("copy_file", _work)
+
+    @mcp.tool() # Copy Tree Tool
+    async def copy_tree(source_path: str, dest_path: str, ctx: Context, overwrite: bool = False) -> str:
+        """
+        Recursively copy a directory within the sandbox. Progress is reported while copying.
+        Symlinked directories and entries that resolve outside the sandbox are skipped.
+
+        Args:
+            source_path: Directory to copy.
+            dest_path: New directory to create with the copy.
+            overwrite: Allow copying into an existing directory, replacing files with the same name.
+        """
+        def _work():
+            source = safe_join(SANDBOX, source_path)
+            dest = safe_join(SANDBOX, dest_path)
+
+            if not source.is_dir():
+                return f"Error: Source '{source_path}' is not a directory."
+            if dest == source or dest.is_relative_to(source):
+                return "Error: Cannot copy a directory into itself."
+            if dest.exists() and not overwrite:
+                return f"Error: Destination '{dest_path}' already exists (pass overwrite=true to copy into it)."
+
+            # Collect everything first, checking each entry, so progress has a total
+            dirs, files, skipped = [], [], []
+            for root, dirnames, filenames in os.walk(source):
+                root = Path(root)
+                rel_root = root.relative_to(source)
+                for name in list(dirnames):
+                    if (root / name).is_symlink():
+                        dirnames.remove(name)
+                        skipped.append(f"{rel_root / name} (symlinked directory)")
+                    else:
+                        dirs.append(rel_root / name)
+                for name in filenames:
+                    entry = root / name
+                    try:
+                        resolved = safe_join(SANDBOX, entry.relative_to(SANDBOX))
+                    except PermissionError:
+                        skipped.append(f"{rel_root / name} (outside sandbox)")
+                        continue
+                    if not resolved.is_file():
+                        skipped.append(f"{rel_root / name} (not a regular file)")
+                        continue
+                    files.append((rel_root / name, resolved.stat().st_size))
+
+            reporter = ProgressReporter(ctx)
+            methods = Counter()
+            done = 0
+
+            # The write side is checked too: an existing symlink in the destination
+            # must not redirect a copy, least of all outside the sandbox
+            blocked = []
+
+            def _dest_ok(rel: Path) -> bool:
+                if any(rel.is_relative_to(b) for b in blocked):
+                    skipped.append(f"{rel} (destination directory skipped)")
+                    return False
+                target = dest / rel
+                if target.is_symlink():
+                    skipped.append(f"{rel} (destination is a symlink)")
+                    return False
+                try:
+                    safe_join(SANDBOX, target.relative_to(SANDBOX))
+                except PermissionError:
+                    skipped.append(f"{rel} (destination outside sandbox)")
+                    return False
+                return True
+
+            try:
+                dest.mkdir(parents=True, exist_ok=True)
+                for rel in dirs:
+                    if not _dest_ok(rel):
+                        blocked.append(rel)
+                dirs = [rel for rel in dirs if rel not in blocked]
+                for rel in dirs:
+                    (dest / rel).mkdir(parents=True, exist_ok=True)
+                files = [(rel, size) for rel, size in files if _dest_ok(rel)]
+                total = sum(size for _, size in files)
+                for i, (rel, _) in enumerate(files, 1):
+                    size, method = _copy_file(source / rel, dest / rel)
+                    methods[method] += 1
+                    done += size
+                    reporter.report(done, total, message=f"Copied {i}/{len(files)} files ({_format_bytes(done)})")
+            except Exception as e:
+                _notify_index(dest)
+                return f"Error copying '{source_path}' after {sum(methods.values())} files: {str(e)}"
+            _notify_index(dest)
+
+            reporter.report(done, total, message=f"Done: {len(files)} files", force=True)
+            how = ", ".join(f"{n} via {m}" for m, n in methods.most_common()) or "no files"
+            return (
+                f"Copied {len(files)} files ({_format_bytes(done)}) and {len(dirs)} directories "
+                f"from '{source_path}' to '{dest_path}' ({how})." + _skipped_note(skipped)
+            )
+
+        return await run_blocking("copy_tree", _work)
+
+    @mcp.tool() # Delete Tree Tool
+    async def delete_tree(path: str, ctx: Context, expected_entries: int | None = None) -> str:
+        """
+        Recursively delete a directory and everything in it. Progress is reported while deleting.
+
+        This is guarded: call it first WITHOUT expected_entries to see what would be
+        deleted (nothing is deleted). Then call again with expected_entries set to the
+        number it reported. Symlinks are removed, never followed.
+
+        Args:
+            path: Directory to delete (never the sandbox root).
+            expected_entries: The entry count from the preview call, confirming the delete.
+        """
+        def _work():
+            target = safe_join(SANDBOX, path)
+
+            if target == SANDBOX:
+                return "Error: Refusing to delete the sandbox root."
+            if not target.exists():
+                return f"Error: '{path}' does not exist."
+            if target.is_symlink() or not target.is_dir():
+                return f"Error: '{path}' is not a directory; use delete_file."
+
+            # Children before parents, so every directory is empty when its turn comes
+            entries = []
+            files = total = 0
+            for root, dirnames, filenames in os.walk(target, topdown=False):
+                root = Path(root)
+                for name in filenames:
+                    entry = root / name
+                    entries.append((entry, False))
+                    files += 1
+                    try:
+                        total += entry.lstat().st_size
+                    except OSError:
+                        pass
+                for name in dirnames:
+                    entry = root / name
+                    is_link = entry.is_symlink()
+                    entries.append((entry, not is_link))
+                    files += is_link  # a symlinked directory is removed like a file
+            entries.append((target, True))
+
+            count = len(entries)
+            if count > DELETE_TREE_MAX_ENTRIES:
+                return f"Error: '{path}' has {count} entries, more than the limit of {DELETE_TREE_MAX_ENTRIES}."
+            if expected_entries != count:
+                return (
+                    f"'{path}' contains {files} files and {count - files} directories "
+                    f"({count} entries, {_format_bytes(total)}). Nothing was deleted. "
+                    f"To delete it, call delete_tree again with expected_entries={count}."
+                )
+
+            reporter = ProgressReporter(ctx)
+            deleted = 0
+            skipped = []
+            for entry, is_dir in entries:
+                try:
+                    # Re-check each parent: it must still resolve inside the sandbox
+                    safe_join(SANDBOX, entry.parent.relative_to(SANDBOX))
+                    entry.rmdir() if is_dir else entry.unlink()
+                    deleted += 1
+                except (OSError, PermissionError, ValueError) as e:
+                    skipped.append(f"{entry.relative_to(SANDBOX)} ({e.__class__.__name__})")
+                reporter.report(deleted, count, message=f"Deleted {deleted}/{count} entries")
+
+            _notify_index(target)
+            reporter.report(deleted, count, message=f"Done: {deleted} entries deleted", force=True)
+            if skipped:
+                return f"Error: Deleted {deleted} of {count} entries in '{path}'." + _skipped_note(skipped)
+            return f"Deleted '{path}' ({files} files, {count - files} directories, {_format_bytes(total)})."
+
+        return await run_blocking("delete_tree", _work)
 
     @mcp.tool() # file info tool
-    async def file_info(path: str) -> dict:
+    async def file_info(path: str, include_hash: bool = False) -> dict:
         """
         Get detailed information about a file or directory inside the sandbox.
 
         Args:
             path: Target file or folder path.
+            include_hash: Also return a content_hash for files, usable as
+                read_file's if_changed_since.
         """
-        target = safe_join(SANDBOX, path)
-        
-        if not target.exists():
-            return {"error":f"'{path}' does not exist. "}
-        
-        try:
-            stat = target.stat()
-            info = {
-                "name" : target.name,
-                "path" : path,
-                "absolute_path": str(target),
-                "type" : "directory" if target.is_dir() else "file",
-
-                "size_bytes" : stat.st_size if target.is_file() else None,
-
-                "created_at" : stat.st_ctime,
-                "modified_at" : stat.st_mtime,
-                "accessed_at" : stat.st_atime,
-
-                "is_empty_directory": (
-                    target.is_dir() and not any(target.iterdir())
-                ),
-            }
-
-            return info
-        
-        except Exception as e:
-            return {"error": f"Error retrieving file info: {str(e)}"}
-        
+        def _work():
+            return _describe(safe_join(SANDBOX, path), path, include_hash)
+
+        return await run_blocking("file_info", _work)
+
+    @mcp.tool() # Stat Many Tool
+    async def stat_many(paths: list[str], include_hash: bool = False) -> dict:
+        """
+        Get file_info for several paths at once, keyed by path.
+
+        Args:
+            paths: File or folder paths inside the sandbox.
+            include_hash: Also return a content_hash for files.
+        """
+        def _work():
+            results = {}
+            for path in paths:
+                try:
+                    results[path] = _describe(safe_join(SANDBOX, path), path, include_hash)
+                except PermissionError as e:
+                    results[path] = {"error": str(e)}
+            return results
+
+        return await run_blocking("stat_many", _work)
+
     @mcp.tool() # Search Files Tool
-    async def search_files(query: str) -> list[str]:
+    async def search_files(query: str, ctx: Context, max_results: int | None = None) -> list[str]:
         """
         Search for files or directories whose names contain the query string.
         The search is recursive inside the sandbox.
+        Matches are streamed as progress notifications while the walk runs.
 
         Args:
             query: The substring to search for (case-insensitive).
+            max_results: Stop after this many matches.
         """
+        def _work():
+            needle = query.lower()
+            matches = []
+            reporter = ProgressReporter(ctx)
+            reported = 0
+            scanned = 0
 
-        query = query.lower()
-        matches = []
+            for path in SANDBOX.rglob('*'):
+                scanned += 1
+                if needle in path.name.lower():
+                    relative_path = path.relative_to(SANDBOX)
+                    matches.append(str(relative_path))
+                    if max_results is not None and len(matches) >= max_results:
+                        break
 
-        for path in SANDBOX.rglob('*'):
-            if query in path.name.lower():
-                relative_path = path.relative_to(SANDBOX)
-                matches.append(str(relative_path))
+                if scanned % 256 == 0 and reporter.report(
+                    scanned, message=f"Scanned {scanned} entries, {len(matches)} matches", partial=matches[reported:]
+                ):
+                    reported = len(matches)
+
+            reporter.report(
+                scanned, scanned, message=f"Done: {len(matches)} matches", partial=matches[reported:], force=True
+            )
+            return matches
+
+        return await run_blocking("search_files", _work)
+
+    @mcp.tool() # Semantic Search Tool
+    async def semantic_search(query: str, ctx: Context, top_k: int = 10, path_prefix: str | None = None) -> dict:
+        """
+        Find the parts of files whose contents are most related to a natural-language
+        query (e.g. "where are retries configured"), not just matching names.
+        Returns the best matching chunks with path, line range, score and a snippet.
+        The first call builds the index, which can take a while on big trees.
+
+        Args:
+            query: What to look for, in words or identifiers.
+            top_k: Number of chunks to return.
+            path_prefix: Only search under this directory.
+        """
+        def _work():
+            if not query.strip():
+                return {"error": "Query is empty."}
+            if path_prefix:
+                safe_join(SANDBOX, path_prefix)
+            index = _get_index()
+
+            if not index.ready.is_set():
+                index.build_in_background()
+                reporter = ProgressReporter(ctx)
+                deadline = time.monotonic() + INDEX_WAIT
+                while not index.ready.wait(0.5) and time.monotonic() < deadline:
+                    if index.status.startswith("error"):
+                        return {"error": f"Building the index failed ({index.status})."}
+                    done, total = index.progress
+                    reporter.report(done, total or None, message=f"Indexing: {done}/{total} files")
+                if not index.ready.is_set():
+                    done, total = index.progress
+                    return {"error": f"The index is still being built ({done}/{total} files). Try again shortly."}
+
+            results = index.search(query, max(1, min(top_k, 100)), path_prefix)
+            return {"results": results, "index": index.stats()}
+
+        return await run_blocking("semantic_search", _work)
 
-        return matches
-    
     @mcp.tool()
     async def create_directory(path: str) -> str:
         """
@@ -249,18 +641,20 @@ def register_file_tools(mcp: FastMCP, sandbox_root: Path):
         Args:
             path: Directory path to create.
         """
+        def _work():
+            target = safe_join(SANDBOX, path)
 
-        target = safe_join(SANDBOX, path)
+            if target.exists():
+                if target.is_dir():
+                    return f"Directory '{path}' already exists."
+                else:
+                    return f"Error: A file with the name '{path}' already exists."
 
-        if target.exists():
-            if target.is_dir():
-                return f"Directory '{path}' already exists."
-            else:
-                return f"Error: A file with the name '{path}' already exists."
 
+            try:
+                target.mkdir(parents=True, exist_ok=True)
+                return f"Created directory '{path}'."
+            except Exception as e:
+                return f"Error creating directory: {str(e)}"
 
-        try:
-            target.mkdir(parents=True, exist_ok=True)
-            return f"Created directory '{path}'."
-        except Exception as e:
-            return f"Error creating directory: {str(e)}"
+        return await run_blocking("create_directory", _work)
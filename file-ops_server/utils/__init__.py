@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Code shared by both servers (mcp_common) lives at the repo root
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
@@ -0,0 +1,103 @@
+import errno
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# Linux ioctl that makes dst share src's blocks (btrfs, XFS, bcachefs; copy-on-write)
+FICLONE = 0x40049409
+# Bytes per copy_file_range / sendfile call
+CHUNK = 64 * 1024 * 1024
+
+# Fall-back errors that mean "this mechanism does not work here", not "the copy failed"
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ETXTBSY, errno.EBADF}
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno in _UNSUPPORTED or e.errno in (errno.ENOTTY, errno.EPERM):
+            return False
+        raise
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(src_fd, dst_fd, min(CHUNK, size - copied))
+            if n == 0:
+                break
+            copied += n
+        return True
+    except OSError as e:
+        if copied == 0 and e.errno in _UNSUPPORTED:
+            return False
+        raise
+
+
+def _sendfile(src_fd: int, dst_fd: int, size: int) -> bool:
+    if not hasattr(os, "sendfile") or not sys.platform.startswith("linux"):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            n = os.sendfile(dst_fd, src_fd, copied, min(CHUNK, size - copied))
+            if n == 0:
+                break
+            copied += n
+        return True
+    except OSError as e:
+        if copied == 0 and e.errno in _UNSUPPORTED:
+            return False
+        raise
+
+
+def copy_file(src: Path, dst: Path) -> tuple[int, str]:
+    """
+    Copy one regular file without pulling its contents through Python.
+
+    Tries a reflink first, then copy_file_range (in-kernel, may also reflink
+    or do server-side copies on NFS/SMB), then sendfile, then a plain
+    buffered copy. Permission bits are copied too. A partial destination is
+    removed on failure. A symlink at dst is never followed (OSError ELOOP).
+    Returns (bytes copied, method used).
+    """
+    with open(src, "rb") as fsrc:
+        size = os.fstat(fsrc.fileno()).st_size
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_BINARY", 0)
+        fd = os.open(dst, flags, 0o666)
+        try:
+            with open(fd, "wb") as fdst:
+                src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+                if size and _reflink(src_fd, dst_fd):
+                    method = "reflink"
+                elif size and _copy_file_range(src_fd, dst_fd, size):
+                    method = "copy_file_range"
+                elif size and _sendfile(src_fd, dst_fd, size):
+                    method = "sendfile"
+                else:
+                    fsrc.seek(0)
+                    fdst.seek(0)
+                    fdst.truncate()
+                    shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+                    method = "copy"
+                if hasattr(os, "fchmod"):
+                    os.fchmod(dst_fd, os.fstat(src_fd).st_mode & 0o7777)
+                else:  # Windows
+                    shutil.copymode(src, dst)
+        except BaseException:
+            dst.unlink(missing_ok=True)
+            raise
+    return size, method
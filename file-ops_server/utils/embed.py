@@ -0,0 +1,80 @@
+import hashlib
+import os
+import re
+import sys
+
+import numpy as np
+
+# Set to a sentence-transformers model name (e.g. all-MiniLM-L6-v2) to use it instead of hashing
+EMBED_MODEL = os.environ.get("FILEOPS_EMBED_MODEL", "")
+HASH_DIM = 512
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z0-9]*|\d+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased words, with identifiers also split into parts (getUserName -> get, user, name)."""
+    tokens = []
+    for word in _WORD.findall(text):
+        lower = word.lower()
+        tokens.append(lower)
+        parts = _CAMEL.findall(word)
+        if len(parts) > 1:
+            tokens.extend(p.lower() for p in parts)
+    return tokens
+
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words embedder: every token and token bigram is
+    hashed to a signed bucket, counts are log-scaled and the vector is
+    L2-normalized. No model download and the same output on every machine,
+    which makes it the offline default.
+    """
+
+    def __init__(self, dim: int = HASH_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> dict[int, float]:
+        tokens = tokenize(text)
+        features = {}
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            index = h % self.dim
+            features[index] = features.get(index, 0.0) + (1.0 if h >> 63 else -1.0)
+        return features
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for index, count in self._features(text).items():
+                vectors[row, index] = np.sign(count) * np.log1p(abs(count))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class ModelEmbedder:
+    """A local sentence-transformers model (optional dependency)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"model-{model_name}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def get_embedder():
+    """The configured model if it can be loaded, else the hashing embedder."""
+    if EMBED_MODEL:
+        try:
+            return ModelEmbedder(EMBED_MODEL)
+        except Exception as e:
+            print(f"[Index] Could not load embedding model '{EMBED_MODEL}' ({e}); using hashing.", file=sys.stderr)
+    return HashingEmbedder()
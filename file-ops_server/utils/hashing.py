@@ -0,0 +1,55 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    import xxhash
+except ImportError:  # optional, blake2b is always available
+    xxhash = None
+
+CHUNK_SIZE = 1024 * 1024
+MAX_ENTRIES = 4096
+
+HASH_ALGORITHM = "xxh3_128" if xxhash is not None else "blake2b"
+
+# (device, inode, size, mtime_ns) -> hex digest
+_cache: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+
+
+def _new_hasher():
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def content_hash(target: Path, stat: os.stat_result | None = None) -> str:
+    """
+    Return the content hash of a file, reading it in chunks.
+
+    Results are cached by (device, inode, size, mtime), so asking again for
+    an unchanged file costs a single stat.
+    """
+    if stat is None:
+        stat = target.stat()
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    with _lock:
+        digest = _cache.get(key)
+        if digest is not None:
+            _cache.move_to_end(key)
+            return digest
+
+    hasher = _new_hasher()
+    with open(target, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    digest = f"{HASH_ALGORITHM}:{hasher.hexdigest()}"
+
+    with _lock:
+        _cache[key] = digest
+        if len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return digest
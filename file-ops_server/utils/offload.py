@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from typing import Callable, TypeVar
+
+import anyio
+from anyio import from_thread, to_thread
+
+from mcp_common.stats import profiled
+
+T = TypeVar("T")
+
+# Size of the shared worker pool every tool draws from.
+# Override with FILEOPS_MAX_THREADS when running against big sandboxes.
+MAX_THREADS = int(os.environ.get("FILEOPS_MAX_THREADS", "16"))
+
+# Per-tool (max concurrent calls, timeout in seconds).
+# Tree walks are the expensive ones, so they get fewer slots and more time.
+DEFAULT_LIMIT = (8, 15.0)
+TOOL_LIMITS = {
+    "search_files": (2, 60.0),
+    "list_directory": (4, 30.0),
+    "read_file": (8, 30.0),
+    "write_file": (4, 30.0),
+    "file_info": (8, 15.0),
+    "stat_many": (4, 30.0),
+    "copy_file": (4, 120.0),
+    "copy_tree": (2, 600.0),
+    "delete_tree": (2, 300.0),
+    "semantic_search": (4, 60.0),
+}
+
+# Minimum seconds between progress notifications from one call
+PROGRESS_INTERVAL = 0.25
+
+_pool_limiter = None
+_tool_limiters = {}
+
+
+def _get_pool_limiter() -> anyio.CapacityLimiter:
+    # Limiters must be created inside the running event loop
+    global _pool_limiter
+    if _pool_limiter is None:
+        _pool_limiter = anyio.CapacityLimiter(MAX_THREADS)
+    return _pool_limiter
+
+
+def _get_tool_limiter(tool_name: str) -> anyio.CapacityLimiter:
+    limiter = _tool_limiters.get(tool_name)
+    if limiter is None:
+        max_calls, _ = TOOL_LIMITS.get(tool_name, DEFAULT_LIMIT)
+        limiter = anyio.CapacityLimiter(max_calls)
+        _tool_limiters[tool_name] = limiter
+    return limiter
+
+
+async def run_blocking(tool_name: str, func: Callable[..., T], *args) -> T:
+    """
+    Run blocking filesystem work for a tool in the shared worker pool.
+
+    The call waits for a free slot of the tool's own limiter, then for a
+    thread from the shared pool, and gives up after the tool's timeout.
+    On timeout the worker thread is abandoned (it finishes in the
+    background) and TimeoutError is raised to the caller.
+    """
+    _, timeout = TOOL_LIMITS.get(tool_name, DEFAULT_LIMIT)
+
+    try:
+        with anyio.fail_after(timeout):
+            async with _get_tool_limiter(tool_name):
+                return await to_thread.run_sync(
+                    profiled(func), *args,
+                    abandon_on_cancel=True,
+                    limiter=_get_pool_limiter(),
+                )
+    except TimeoutError:
+        raise TimeoutError(f"'{tool_name}' timed out after {timeout:.0f}s.")
+
+
+class ProgressReporter:
+    """
+    Sends MCP progress notifications from inside a run_blocking worker.
+
+    The notification message is a JSON object: {"message": str, "partial": [...]}
+    where "partial" holds the results found since the previous report, so a
+    client can show them (or stop the call) before the tool returns.
+    Reports are throttled to one per PROGRESS_INTERVAL unless forced.
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.last_report = 0.0
+
+    def report(self, progress: float, total: float | None = None, message: str = "", partial: list | None = None, force: bool = False):
+        # Stop the worker early if the call was cancelled or timed out
+        from_thread.check_cancelled()
+
+        now = time.monotonic()
+        if not force and now - self.last_report < PROGRESS_INTERVAL:
+            return False
+        self.last_report = now
+
+        payload = json.dumps({"message": message, "partial": partial or []})
+        from_thread.run(self.ctx.report_progress, progress, total, payload)
+        return True
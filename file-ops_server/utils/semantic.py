@@ -0,0 +1,327 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .embed import HashingEmbedder, get_embedder
+
+INDEX_ROOT = Path(os.environ.get("FILEOPS_INDEX_DIR", Path(__file__).parent.parent / "index"))
+# Worker processes for (re)building the index; 0 embeds in the calling thread
+INDEX_WORKERS = int(os.environ.get("FILEOPS_INDEX_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Below this many files to embed, a process pool costs more than it saves
+POOL_MIN_FILES = 64
+# Seconds between full rescans, which catch edits made outside the server's tools
+RESCAN_INTERVAL = float(os.environ.get("FILEOPS_INDEX_RESCAN", "60"))
+
+CHUNK_LINES = 40
+CHUNK_OVERLAP = 10
+MAX_FILE_BYTES = 1024 * 1024
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv"}
+
+
+def chunk_text(text: str) -> list[tuple[int, int, str]]:
+    """Overlapping windows of CHUNK_LINES lines: (first line, last line, text), 1-based."""
+    lines = text.splitlines()
+    chunks = []
+    step = CHUNK_LINES - CHUNK_OVERLAP
+    for start in range(0, max(len(lines), 1), step):
+        window = lines[start:start + CHUNK_LINES]
+        if any(line.strip() for line in window):
+            chunks.append((start + 1, start + len(window), "\n".join(window)))
+        if start + CHUNK_LINES >= len(lines):
+            break
+    return chunks
+
+
+def inside(root: Path, path: Path) -> bool:
+    """Whether path resolves (through any symlinks) to somewhere under root, like safe_join."""
+    try:
+        return path.resolve().is_relative_to(root)
+    except (OSError, RuntimeError):
+        return False
+
+
+def read_text(root: Path, rel: str) -> str | None:
+    """File contents if it is inside the sandbox, looks like text and is not too big, else None."""
+    path = root / rel
+    if not inside(root, path):
+        return None
+    try:
+        if path.stat().st_size > MAX_FILE_BYTES:
+            return None
+        data = path.read_bytes()
+    except OSError:
+        return None
+    if b"\0" in data[:8192]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def embed_file(root: str, rel: str, dim: int):
+    """
+    Process-pool worker: chunk and embed one file with the hashing embedder.
+    Returns (rel, [(start, end), ...], vectors) or (rel, [], None) for skipped files.
+    """
+    text = read_text(Path(root), rel)
+    chunks = chunk_text(text) if text else []
+    if not chunks:
+        return rel, [], None
+    # The file's path is part of every chunk, so names count as well as contents
+    vectors = HashingEmbedder(dim).embed([f"{rel}\n{body}" for _, _, body in chunks])
+    return rel, [(start, end) for start, end, _ in chunks], vectors
+
+
+class SemanticIndex:
+    """
+    On-disk vector index of chunked file contents for one sandbox.
+
+    vectors.npy holds one L2-normalized row per chunk and meta.json maps
+    rows to (path, first line, last line) and records each file's size and
+    mtime, so rebuilds only re-embed files that changed. Search is a single
+    matrix-vector product over all rows.
+    """
+
+    def __init__(self, sandbox: Path, index_dir: Path | None = None):
+        self.sandbox = sandbox.resolve()
+        key = hashlib.blake2b(str(sandbox).encode(), digest_size=8).hexdigest()
+        self.dir = index_dir or INDEX_ROOT / key
+        self.embedder = get_embedder()
+        self.lock = threading.RLock()
+        self.files: dict[str, tuple[int, int]] = {}  # rel -> (size, mtime_ns)
+        self.rows: list[tuple[str, int, int]] = []  # row -> (rel, start, end)
+        self.vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self.pending: set[str] = set()
+        self.status = "empty"
+        self.progress = (0, 0)
+        self.last_scan = 0.0
+        self.ready = threading.Event()  # set once the index covers the sandbox (or was loaded)
+        self._building = threading.Lock()
+        self._load()
+
+    # ---- persistence ----
+
+    def _load(self):
+        meta_path, vectors_path = self.dir / "meta.json", self.dir / "vectors.npy"
+        if not (meta_path.exists() and vectors_path.exists()):
+            return
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("embedder") != self.embedder.name:
+                return  # different embedding space; rebuild from scratch
+            vectors = np.load(vectors_path)
+            if len(vectors) != len(meta["rows"]):
+                return
+            self.files = {rel: tuple(v) for rel, v in meta["files"].items()}
+            self.rows = [tuple(r) for r in meta["rows"]]
+            self.vectors = vectors
+            self.status = "loaded"
+            self.ready.set()  # usable right away; the first search triggers a rescan
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Index] Ignoring unreadable index in {self.dir}: {e}", file=sys.stderr)
+
+    def _save(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        meta = {"embedder": self.embedder.name, "files": self.files, "rows": self.rows}
+        tmp_vectors = self.dir / "vectors.tmp.npy"
+        np.save(tmp_vectors, self.vectors)
+        tmp_meta = self.dir / "meta.tmp.json"
+        tmp_meta.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp_vectors, self.dir / "vectors.npy")
+        os.replace(tmp_meta, self.dir / "meta.json")
+
+    # ---- updates ----
+
+    def _scan(self, top: Path | None = None) -> dict[str, tuple[int, int]]:
+        """(size, mtime_ns) of every indexable file under top, keyed by sandbox-relative path."""
+        found = {}
+        top = top or self.sandbox
+        # Symlinks are only followed when they stay inside the sandbox, as in read_file
+        if not inside(self.sandbox, top):
+            return found
+        for root, dirnames, filenames in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+            for name in filenames:
+                path = Path(root) / name
+                # os.walk doesn't descend into symlinked directories, so only file links need a check
+                if path.is_symlink() and not inside(self.sandbox, path):
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if stat.st_size <= MAX_FILE_BYTES:
+                    found[path.relative_to(self.sandbox).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def _embed(self, rels: list[str]):
+        """Yield (rel, spans, vectors) for files, in a process pool when there are many."""
+        if isinstance(self.embedder, HashingEmbedder) and INDEX_WORKERS > 0 and len(rels) >= POOL_MIN_FILES:
+            # spawn: forking a process that runs threads is unsafe
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(INDEX_WORKERS, mp_context=context) as pool:
+                yield from pool.map(
+                    embed_file, [str(self.sandbox)] * len(rels), rels, [self.embedder.dim] * len(rels), chunksize=16
+                )
+            return
+        for rel in rels:
+            text = read_text(self.sandbox, rel)
+            chunks = chunk_text(text) if text else []
+            if not chunks:
+                yield rel, [], None
+                continue
+            vectors = self.embedder.embed([f"{rel}\n{body}" for _, _, body in chunks])
+            yield rel, [(start, end) for start, end, _ in chunks], vectors
+
+    def _apply(self, removed: set[str], results: list):
+        """Drop the rows of removed/changed files and append the new ones."""
+        with self.lock:
+            if removed:
+                keep = np.fromiter((row[0] not in removed for row in self.rows), dtype=bool, count=len(self.rows))
+                self.vectors = self.vectors[keep]
+                self.rows = [row for row, k in zip(self.rows, keep) if k]
+                for rel in removed:
+                    self.files.pop(rel, None)
+
+            new_vectors = []
+            for rel, stat, spans, vectors in results:
+                self.files[rel] = stat
+                if vectors is not None:
+                    self.rows.extend((rel, start, end) for start, end in spans)
+                    new_vectors.append(vectors)
+            if new_vectors:
+                self.vectors = np.concatenate([self.vectors, *new_vectors])
+
+    def build(self, on_progress=None):
+        """Bring the index up to date with the sandbox, re-embedding only changed files."""
+        if not self._building.acquire(blocking=False):
+            return  # another build is already running
+        try:
+            self.status = "building"
+            found = self._scan()
+            changed = [rel for rel, stat in found.items() if self.files.get(rel) != stat]
+            removed = {rel for rel in self.files if rel not in found} | set(changed)
+
+            results = []
+            self.progress = (0, len(changed))
+            for i, (rel, spans, vectors) in enumerate(self._embed(changed), 1):
+                results.append((rel, found[rel], spans, vectors))
+                self.progress = (i, len(changed))
+                if on_progress:
+                    on_progress(i, len(changed))
+
+            if removed or results:
+                self._apply(removed, results)
+                with self.lock:
+                    self._save()
+            self.last_scan = time.monotonic()
+            self.status = "ready"
+            self.ready.set()
+        except Exception as e:
+            self.status = f"error: {e}"
+            print(f"[Index] Build failed: {e}", file=sys.stderr)
+        finally:
+            self._building.release()
+
+    def build_in_background(self):
+        if self._building.locked():
+            return
+        threading.Thread(target=self.build, daemon=True, name="semantic-index").start()
+
+    def notify(self, *paths: Path):
+        """Called by the tools after they change files or directories."""
+        with self.lock:
+            for path in paths:
+                try:
+                    self.pending.add(path.relative_to(self.sandbox).as_posix())
+                except ValueError:
+                    pass
+
+    def refresh_pending(self):
+        """
+        Re-embed files changed through the server's tools since the last
+        search. Does nothing while a build runs; the paths stay pending for
+        the next search (the two would otherwise apply conflicting changes).
+        """
+        if not self._building.acquire(blocking=False):
+            return
+        try:
+            self._refresh_pending()
+        finally:
+            self._building.release()
+
+    def _refresh_pending(self):
+        with self.lock:
+            pending, self.pending = self.pending, set()
+        if not pending:
+            return
+
+        # A path may be a file or a directory (copy_tree, delete_tree, moves)
+        current = {}
+        stale = set()
+        for rel in pending:
+            path = self.sandbox / rel
+            prefix = rel + "/"
+            stale |= {f for f in self.files if f == rel or f.startswith(prefix)}
+            if path.is_dir():
+                current.update(self._scan(path))
+            elif path.is_file() and inside(self.sandbox, path):
+                stat = path.stat()
+                if stat.st_size <= MAX_FILE_BYTES:
+                    current[rel] = (stat.st_size, stat.st_mtime_ns)
+
+        results = [(rel, current[rel], spans, vectors) for rel, spans, vectors in self._embed(list(current))]
+        self._apply(stale | set(current), results)
+        with self.lock:
+            self._save()
+
+    # ---- search ----
+
+    def stats(self) -> dict:
+        return {
+            "status": self.status,
+            "files": len(self.files),
+            "chunks": len(self.rows),
+            "embedder": self.embedder.name,
+        }
+
+    def search(self, query: str, top_k: int = 10, path_prefix: str | None = None) -> list[dict]:
+        if RESCAN_INTERVAL and time.monotonic() - self.last_scan > RESCAN_INTERVAL:
+            self.build_in_background()
+        self.refresh_pending()
+
+        query_vector = self.embedder.embed([query])[0]
+        with self.lock:
+            if not self.rows:
+                return []
+            scores = self.vectors @ query_vector
+            if path_prefix:
+                prefix = path_prefix.strip("/") + "/"
+                mask = np.fromiter(
+                    (r[0].startswith(prefix) or r[0] == prefix[:-1] for r in self.rows), dtype=bool, count=len(self.rows)
+                )
+                scores = np.where(mask, scores, -np.inf)
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            hits = [(self.rows[i], float(scores[i])) for i in top if np.isfinite(scores[i]) and scores[i] > 0]
+
+        results = []
+        for (rel, start, end), score in hits:
+            text = read_text(self.sandbox, rel)
+            if text is None:
+                continue  # gone, or now a symlink out of the sandbox; the next rescan drops it
+            snippet = "\n".join(text.splitlines()[start - 1:end])
+            results.append({
+                "path": rel,
+                "lines": f"{start}-{end}",
+                "score": round(score, 4),
+                "snippet": snippet[:600],
+            })
+        return results
@@ -15,4 +15,8 @@ export type AgentEvent = {
     max_steps?: number
     error?: string
     reason?: string
+    progress?: number
+    total?: number | null
+    message?: string
+    partial_count?: number
 }
\ No newline at end of file
@@ -75,6 +75,9 @@ export function DebugSidebar({ events, visible }: Props) {
                     {reqEvents.map((e, idx) => {
                         if (
                         e.type !== "tool_call_started" &&
+                        e.type !== "tool_call_progress" &&
+                        e.type !== "tool_call_deduplicated" &&
+                        e.type !== "loop_detected" &&
                         e.type !== "tool_call_succeeded" &&
                         e.type !== "tool_call_failed" &&
                         e.type !== "policy_blocked" &&
@@ -83,6 +86,14 @@ export function DebugSidebar({ events, visible }: Props) {
                         return null
                         }
 
+                        // Only the latest progress update of a running tool is shown
+                        if (
+                        e.type === "tool_call_progress" &&
+                        reqEvents.slice(idx + 1).some(n => n.tool === e.tool)
+                        ) {
+                        return null
+                        }
+
                         let color = "#333"
                         if (
                         e.type === "tool_call_failed" ||
@@ -90,6 +101,9 @@ export function DebugSidebar({ events, visible }: Props) {
                         ) {
                         color = "red"
                         }
+                        if (e.type === "loop_detected" || e.type === "tool_call_deduplicated") {
+                        color = "darkorange"
+                        }
                         if (e.type === "tool_call_succeeded") {
                         color = "green"
                         }
@@ -98,6 +112,8 @@ export function DebugSidebar({ events, visible }: Props) {
                         <div key={idx} style={{ marginTop: 6, color }}>
                             <div><strong>{e.type}</strong></div>
                             {e.tool && <div>Tool: {e.tool}</div>}
+                            {e.message && <div>{e.message}</div>}
+                            {e.partial_count ? <div>Partial results: {e.partial_count}</div> : null}
                             {e.error && <div>Error: {e.error}</div>}
                             {e.reason && <div>Reason: {e.reason}</div>}
                         </div>
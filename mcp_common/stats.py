@@ -0,0 +1,306 @@
+import contextvars
+import cProfile
+import functools
+import inspect
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+from mcp.server.fastmcp import FastMCP, Context
+
+# Dump stats every N seconds (0 = never), to MCP_STATS_FILE as JSON lines or to stderr
+STATS_INTERVAL = float(os.environ.get("MCP_STATS_INTERVAL", "0"))
+STATS_FILE = os.environ.get("MCP_STATS_FILE")
+# Profile a sampled fraction of calls and keep the profiles of calls slower than the threshold
+PROFILE_SLOW_MS = float(os.environ.get("MCP_PROFILE_SLOW_MS", "0"))
+PROFILE_SAMPLE = float(os.environ.get("MCP_PROFILE_SAMPLE", "0.1"))
+PROFILE_DIR = Path(os.environ.get("MCP_PROFILE_DIR", "profiles"))
+
+# Tools whose string result is content (file text, page HTML), so a leading "Error" means nothing;
+# their failures are counted from exceptions only
+RAW_TEXT_TOOLS = {"read_file", "get_page_content"}
+
+# Latency histogram bucket upper bounds in milliseconds (the last bucket is everything above)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+try:
+    from pyinstrument import Profiler  # optional, understands async code
+except ImportError:
+    Profiler = None
+
+# The profile of the call being run, so worker threads started for it can profile themselves
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+class CallProfile:
+    """The profilers of one sampled call: the event loop's and one per worker thread it used."""
+
+    def __init__(self):
+        if Profiler is not None:
+            self.main = Profiler(async_mode="enabled")
+            self.main.start()
+        else:
+            self.main = cProfile.Profile()
+            self.main.enable()
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def stop(self):
+        if Profiler is not None:
+            self.main.stop()
+        else:
+            self.main.disable()
+
+    def save(self, stem: Path):
+        if Profiler is not None:
+            parts = [self.main.output_text(unicode=True)]
+            parts += [f"--- worker thread ---\n{w.output_text(unicode=True)}" for w in self.workers]
+            stem.with_suffix(".txt").write_text("\n\n".join(parts), encoding="utf-8")
+        else:
+            merged = pstats.Stats(self.main)
+            for worker in self.workers:
+                merged.add(worker)
+            merged.dump_stats(stem.with_suffix(".prof"))
+
+
+def profiled(func):
+    """
+    Wrap blocking work that runs in a worker thread (run_blocking) so that,
+    when its call is being profiled, the thread is profiled too: cProfile
+    and pyinstrument only see the thread they were started in.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if Profiler is not None:
+            worker = Profiler(async_mode="disabled")
+            worker.start()
+        else:
+            worker = cProfile.Profile()
+            worker.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if Profiler is not None:
+                worker.stop()
+            else:
+                worker.disable()
+            with profile.lock:
+                profile.workers.append(worker)
+
+    return wrapper
+
+
+class ToolStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Upper bound of the bucket holding the given fraction of calls."""
+        if not self.calls:
+            return None
+        rank = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.histogram):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        done = self.calls
+        return {
+            "calls": done,
+            "errors": self.errors,
+            "error_rate": round(self.errors / done, 4) if done else 0.0,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "avg_ms": round(self.total_ms / done, 2) if done else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 2),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "histogram_ms": {
+                **{f"<={b}": n for b, n in zip(BUCKETS_MS, self.histogram)},
+                f">{BUCKETS_MS[-1]}": self.histogram[-1],
+            },
+        }
+
+
+class ServerStats:
+    """Per-tool counters shared by every instrumented tool of one server."""
+
+    def __init__(self, server_name: str):
+        self.server_name = server_name
+        self.started = time.time()
+        self.tools: dict[str, ToolStats] = {}
+        self.lock = threading.Lock()
+        self._profiling = False
+
+    def begin(self, tool: str, bytes_in: int) -> ToolStats:
+        with self.lock:
+            stats = self.tools.setdefault(tool, ToolStats())
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+            stats.bytes_in += bytes_in
+        return stats
+
+    def end(self, stats: ToolStats, elapsed_ms: float, bytes_out: int, failed: bool):
+        with self.lock:
+            stats.in_flight -= 1
+            stats.calls += 1
+            stats.errors += failed
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.bytes_out += bytes_out
+            bucket = next((i for i, b in enumerate(BUCKETS_MS) if elapsed_ms <= b), len(BUCKETS_MS))
+            stats.histogram[bucket] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "server": self.server_name,
+                "uptime_s": round(time.time() - self.started, 1),
+                "tools": {name: s.to_dict() for name, s in sorted(self.tools.items())},
+            }
+
+    def reset(self):
+        with self.lock:
+            self.tools = {name: ToolStats() for name in self.tools}
+            self.started = time.time()
+
+    def start_profile(self) -> CallProfile | None:
+        """A profile for this call, or None when not sampled (one profile runs at a time)."""
+        if PROFILE_SLOW_MS <= 0 or random.random() >= PROFILE_SAMPLE:
+            return None
+        with self.lock:
+            if self._profiling:
+                return None
+            self._profiling = True
+        return CallProfile()
+
+    def finish_profile(self, profile: CallProfile, tool: str, elapsed_ms: float):
+        try:
+            profile.stop()
+            if elapsed_ms < PROFILE_SLOW_MS:
+                return
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            profile.save(PROFILE_DIR / f"{self.server_name}-{tool}-{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed_ms)}ms")
+        except Exception as e:
+            print(f"[Stats] Could not save profile for {tool}: {e}", file=sys.stderr)
+        finally:
+            with self.lock:
+                self._profiling = False
+
+
+def _size(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(json.dumps(value, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _failed(tool: str, result) -> bool:
+    # Raised exceptions count as failures in _wrap. Tools also report problems
+    # as {"error": ...} dicts or "Error: ..." strings, except where a string is content.
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, str) and tool not in RAW_TEXT_TOOLS:
+        return result.startswith("Error")
+    return False
+
+
+def _wrap(stats: ServerStats, tool: str, fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        payload = {k: v for k, v in kwargs.items() if not isinstance(v, Context)}
+        tool_stats = stats.begin(tool, _size(payload))
+        profile = stats.start_profile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        result = None
+        failed = True
+        try:
+            result = fn(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            failed = _failed(tool, result)
+            return result
+        finally:
+            _current_profile.reset(token)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats.end(tool_stats, elapsed_ms, _size(result), failed)
+            if profile is not None:
+                stats.finish_profile(profile, tool, elapsed_ms)
+
+    return wrapper
+
+
+def _dump_loop(stats: ServerStats):
+    while True:
+        time.sleep(STATS_INTERVAL)
+        line = json.dumps({"timestamp": time.time(), **stats.snapshot()})
+        try:
+            if STATS_FILE:
+                with open(STATS_FILE, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            else:
+                print(f"[Stats] {line}", file=sys.stderr)
+        except OSError as e:
+            print(f"[Stats] Could not write stats: {e}", file=sys.stderr)
+
+
+def instrument(mcp: FastMCP) -> ServerStats:
+    """
+    Record call counts, latency, bytes in/out, errors and concurrency for
+    every tool registered on mcp from now on, and add a server_stats tool.
+    Call before the tools are registered.
+    """
+    stats = ServerStats(mcp.name)
+    register = mcp.tool
+
+    @functools.wraps(register)
+    def tool(name: str | None = None, *args, **kwargs):
+        def decorator(fn):
+            return register(name, *args, **kwargs)(_wrap(stats, name or fn.__name__, fn))
+        return decorator
+
+    mcp.tool = tool
+
+    @register()
+    async def server_stats(reset: bool = False) -> dict:
+        """
+        Performance counters for every tool of this server since start (or the last reset):
+        calls, errors, in-flight calls, latency percentiles and histogram, bytes in and out.
+        """
+        snapshot = stats.snapshot()
+        if reset:
+            stats.reset()
+        return snapshot
+
+    if STATS_INTERVAL > 0:
+        threading.Thread(target=_dump_loop, args=(stats,), daemon=True, name="stats-dump").start()
+    return stats